@@ -0,0 +1,133 @@
+"""
+End-to-end benchmark of the cli commands against the mock speedport (benchmarks/mock_router.py).
+For every command the latency, the number of round trips (including authentication challenges), the time spent parsing
+responses and the peak memory are measured, at a realistic and a stress scale.
+
+    $ python benchmarks/commands.py --runs 20 --latency 5 --save baseline.json
+    $ python benchmarks/commands.py --runs 20 --latency 5 --compare baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speedport  # noqa: E402
+from classes import cache, profiling  # noqa: E402
+from classes.client import SpeedportClient  # noqa: E402
+from mock_router import MockRouter, RouterData  # noqa: E402
+
+# scale name -> RouterData arguments
+SCALES = {
+    "realistic": {"clients": 10, "hosts": 40, "log_lines": 300},
+    "stress": {"clients": 250, "hosts": 2000, "log_lines": 20000},
+}
+
+
+def commands(client: SpeedportClient):
+    """
+    :param client: SpeedportClient of the mock router
+    :return: dictionary command name -> callable running the command
+    """
+    interface = client.wifi_interface(1)
+
+    def syslog():
+        with contextlib.redirect_stdout(io.StringIO()):
+            speedport.print_syslog(client, -1, "", False)
+
+    return {
+        "get_all_wifi_interfaces": client.wifi_interfaces,
+        "get_clients_for_wifi_interface": lambda: client.wifi_clients(interface),
+        "get_clients_for_all_wifi_interfaces": client.all_wifi_clients,
+        "get_external_ips": lambda: speedport.format_external_ips(client.external_ips()),
+        "print_syslog": syslog,
+    }
+
+
+def measure(router: MockRouter, profiler: profiling.Profiler, function, runs: int):
+    """
+    Run a command several times
+    :param router: the mock router, to count round trips
+    :param profiler: Profiler of the client, the parse time is taken from its parse phase
+    :param function: the command
+    :param runs: number of measured runs
+    :return: dictionary with the results
+    """
+    function()  # warm up (connection, authentication)
+
+    latencies = []
+    router.reset_counters()
+    profiler.reset()
+    for x in range(runs):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    round_trips = router.requests / runs
+    bytes_received = router.bytes_sent / runs
+    parse_time = sum(entry["self_ms"] for entry in profiler.report() if entry["name"] == "parse") / 1000 / runs
+
+    tracemalloc.start()
+    function()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {"median_ms": statistics.median(latencies) * 1000, "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+            "round_trips": round_trips, "parse_ms": parse_time * 1000, "kib_received": bytes_received / 1024, "peak_kib": peak_memory / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the cli commands against the mock speedport")
+    parser.add_argument("-r", "--runs", help="Number of measured runs per command", type=int, default=10)
+    parser.add_argument("-s", "--scale", help="Only run the given scales", choices=SCALES, action="append")
+    parser.add_argument("-l", "--latency", help="Delay of each mock response in milliseconds", type=float, default=0)
+    parser.add_argument("--cache", help="Cache static parameters, like the cli does by default", action="store_true")
+    parser.add_argument("--save", help="Write the results to a json file", metavar="file", default=None)
+    parser.add_argument("--compare", help="Compare with results saved before, fails if a median latency got more than --tolerance slower", metavar="file", default=None)
+    parser.add_argument("--tolerance", help="Allowed slowdown in percent for --compare", type=float, default=20)
+    args = parser.parse_args()
+
+    results = {}
+    for scale in args.scale or SCALES:
+        router = MockRouter(RouterData(**SCALES[scale]), latency=args.latency / 1000).start()
+        profiler = profiling.Profiler()
+        client = SpeedportClient(router.address, router.password, port=router.port, cache=cache.ResponseCache() if args.cache else None, profiler=profiler)
+        try:
+            for name, function in commands(client).items():
+                results[f"{scale}/{name}"] = measure(router, profiler, function, args.runs)
+        finally:
+            client.close()
+            router.stop()
+
+    print(f"{'command':<44} {'median (ms)':>11} {'p95 (ms)':>9} {'round trips':>11} {'parse (ms)':>10} {'KiB recv':>9} {'peak KiB':>9}")
+    for name, result in results.items():
+        print(f"{name:<44} {result['median_ms']:>11.2f} {result['p95_ms']:>9.2f} {result['round_trips']:>11.1f} {result['parse_ms']:>10.2f} {result['kib_received']:>9.1f} "
+              f"{result['peak_kib']:>9.1f}")
+
+    if args.save is not None:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = []
+        for name, result in results.items():
+            if name in baseline and result["median_ms"] > baseline[name]["median_ms"] * (1 + args.tolerance / 100):
+                regressions.append(f"{name}: {baseline[name]['median_ms']:.2f} ms -> {result['median_ms']:.2f} ms")
+            if name in baseline and result["round_trips"] > baseline[name]["round_trips"]:
+                regressions.append(f"{name}: {baseline[name]['round_trips']:.1f} -> {result['round_trips']:.1f} round trips")
+        if len(regressions) > 0:
+            print("[-] Regressions:\n" + "\n".join(regressions))
+            exit(1)
+        print("[+] No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""
+Local stand-in for the TR-064 (SOAP) interface of the speedport, for benchmarks and manual testing without a router.
+Answers GetParameterValues requests over HTTPS with digest authentication (user dslf-config, realm BT), like the speedport.
+The number of wifi clients, hosts and log lines as well as the latency of each response can be configured.
+
+    $ python benchmarks/mock_router.py --port 49443 --clients 10 --hosts 40 --log-lines 300 --latency 20
+    $ python speedport.py -a 127.0.0.1 --port 49443 -p secret -w
+"""
+import argparse
+import hashlib
+import os
+import re
+import secrets
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+# message codes used for generated log lines, covers all message groups
+LOG_CODES = ["W005", "W001", "IG001", "VPN001", "R013", "R001", "HYB002", "LT001", "D001", "V006", "V001", "T102", "NT001", "EP001", "G101", "DH001", "X001"]
+
+# speedport model data, answered for the device info parameters
+DEVICE_INFO = {
+    "Device.DeviceInfo.UpTime": "123456",
+    "Device.DeviceInfo.SoftwareVersion": "120138.4.0.007.0",
+    "Device.DeviceInfo.ModelName": "Speedport Pro",
+    "Device.DeviceInfo.Manufacturer": "Arcadyan",
+    "Device.DeviceInfo.SerialNumber": "AR0000000000",
+    "Device.DeviceInfo.HardwareVersion": "1.0",
+    "Device.DSL.Channel.1.DownstreamCurrRate": "100000",
+    "Device.DSL.Channel.1.UpstreamCurrRate": "40000",
+}
+
+
+class RouterData:
+    """
+    Class holding the parameters of the emulated speedport
+    """
+
+    def __init__(self, interfaces: int = 7, up_interfaces=(1, 2, 5), clients: int = 3, hosts: int = 40, log_lines: int = 300):
+        """
+        :param interfaces: number of wifi interfaces
+        :param up_interfaces: ids of the interfaces which are up
+        :param clients: number of clients per up interface
+        :param hosts: number of entries in the host table, clients are listed first
+        :param log_lines: number of log lines
+        """
+        self.interfaces = interfaces
+        self.up_interfaces = set(up_interfaces)
+        self.clients = clients
+        self.hosts = hosts
+        self.log_lines = log_lines
+        self.lock = threading.Lock()
+        self.parameters = {}  # parameter name -> value, in the order of the routers parameter tree
+        self.build()
+
+    def build(self):
+        """
+        Generate all parameters
+        """
+        parameters = {}
+        for x in range(1, self.interfaces + 1):
+            parameters[f"Device.WiFi.SSID.{x}.Status"] = "Up" if x in self.up_interfaces else "Down"
+            parameters[f"Device.WiFi.SSID.{x}.SSID"] = f"speedport-{x}"
+            parameters[f"Device.WiFi.SSID.{x}.BSSID"] = f"00:11:22:33:44:{x:02x}"
+        for x in range(1, self.interfaces + 1):
+            parameters[f"Device.WiFi.Radio.{x}.SupportedFrequencyBands"] = "2.4GHz" if x % 2 == 1 else "5GHz"
+            parameters[f"Device.WiFi.Radio.{x}.Channel"] = str(1 + x * 5 % 13) if x % 2 == 1 else str(36 + x * 4)
+            parameters[f"Device.WiFi.Radio.{x}.TransmitPower"] = "100"
+            parameters[f"Device.WiFi.Radio.{x}.MaxBitRate"] = "1300"
+
+        client_macs = []
+        for x in range(1, self.interfaces + 1):
+            parameters[f"Device.WiFi.AccessPoint.{x}.Security.ModeEnabled"] = "WPA2-Personal"
+            clients = self.clients if x in self.up_interfaces else 0
+            parameters[f"Device.WiFi.AccessPoint.{x}.AssociatedDeviceNumberOfEntries"] = str(clients)
+            for y in range(1, clients + 1):
+                mac = f"aa:bb:{x:02x}:{y >> 16 & 255:02x}:{y >> 8 & 255:02x}:{y & 255:02x}"
+                client_macs.append(mac)
+                path = f"Device.WiFi.AccessPoint.{x}.AssociatedDevice.{y}."
+                parameters[path + "MACAddress"] = mac
+                parameters[path + "SignalStrength"] = str(-40 - y * 7 % 50)
+                parameters[path + "LastDataDownlinkRate"] = str(6500 + y * 1000 % 860000)
+                parameters[path + "LastDataUplinkRate"] = str(6500 + y * 3000 % 400000)
+                parameters[path + "Active"] = "true"
+
+        parameters["Device.Hosts.HostNumberOfEntries"] = str(self.hosts)
+        for x in range(1, self.hosts + 1):
+            path = f"Device.Hosts.Host.{x}."
+            parameters[path + "PhysAddress"] = client_macs[x - 1] if x <= len(client_macs) else f"cc:dd:00:{x >> 16 & 255:02x}:{x >> 8 & 255:02x}:{x & 255:02x}"
+            parameters[path + "IPAddress"] = f"192.168.{2 + x // 250}.{x % 250 + 2}"
+            parameters[path + "HostName"] = f"host-{x}" if x % 5 != 0 else ""  # some devices don't send a name
+            parameters[path + "Active"] = "true"
+            parameters[path + "Layer1Interface"] = "Device.WiFi.SSID.1" if x <= len(client_macs) else "Device.Ethernet.Interface.1"
+
+        for x, alias in zip(range(2, 6), ["BOND", "LTE", "DSL", "VOIP"]):
+            parameters[f"Device.IP.Interface.{x}.Alias"] = alias
+            parameters[f"Device.IP.Interface.{x}.IPv4Address.1.IPAddress"] = f"80.128.0.{x}" if alias != "LTE" else ""
+
+        # newest entry first, one entry per second
+        start = time.mktime((2021, 3, 15, 12, 0, 0, 0, 0, -1))
+        parameters["Device.DeviceInfo.X_T-ONLINE-DE_DeviceLog"] = "\n".join(
+            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start - x))}  ({LOG_CODES[x % len(LOG_CODES)]}) message {x}" for x in range(self.log_lines))
+        parameters.update(DEVICE_INFO)
+
+        with self.lock:
+            self.parameters = parameters
+
+    def values(self, names):
+        """
+        Get the values of requested parameters
+        :param names: list of parameter names, partial paths (ending with a dot) return all parameters below them
+        :return: tuple (list of (name, value) tuples, first unknown parameter name or None)
+        """
+        with self.lock:
+            parameters = self.parameters
+        values = []
+        for name in names:
+            if name.endswith("."):
+                found = [(key, value) for key, value in parameters.items() if key.startswith(name)]
+                if len(found) == 0 and name[:-1] + "NumberOfEntries" not in parameters:  # an empty table (e.g. no clients) is a valid path
+                    return values, name
+                values += found
+            elif name in parameters:
+                values.append((name, parameters[name]))
+            else:
+                return values, name
+        return values, None
+
+
+def response_document(values):
+    """
+    Build a GetParameterValuesResponse
+    :param values: list of (name, value) tuples
+    :return: encoded document
+    """
+    entries = "".join(f"<ParameterValueStruct><Name>{escape(name)}</Name><Value xsi:type=\"xsd:string\">{escape(value)}</Value></ParameterValueStruct>" for name, value in values)
+    return ("<?xml version=\"1.0\"?><SOAP-ENV:Envelope xmlns:SOAP-ENV=\"http://schemas.xmlsoap.org/soap/envelope/\" xmlns:xsi=\"http://www.w3.org/2001/XMLSchema-instance\" "
+            "xmlns:xsd=\"http://www.w3.org/2001/XMLSchema\" xmlns:cwmp=\"urn:dslforum-org:cwmp-1-0\"><SOAP-ENV:Body><cwmp:GetParameterValuesResponse>"
+            f"<ParameterList length=\"{len(values)}\">{entries}</ParameterList></cwmp:GetParameterValuesResponse></SOAP-ENV:Body></SOAP-ENV:Envelope>").encode()
+
+
+def fault_document(code: int, message: str):
+    """
+    Build a SOAP fault, as sent by the speedport for invalid parameter names
+    :param code: cwmp fault code, e.g. 9005 (invalid parameter name)
+    :param message: fault string
+    :return: encoded document
+    """
+    return ("<?xml version=\"1.0\"?><SOAP-ENV:Envelope xmlns:SOAP-ENV=\"http://schemas.xmlsoap.org/soap/envelope/\" xmlns:cwmp=\"urn:dslforum-org:cwmp-1-0\"><SOAP-ENV:Body>"
+            "<SOAP-ENV:Fault><faultcode>Client</faultcode><faultstring>CWMP fault</faultstring><detail><cwmp:Fault>"
+            f"<FaultCode>{code}</FaultCode><FaultString>{escape(message)}</FaultString></cwmp:Fault></detail></SOAP-ENV:Fault></SOAP-ENV:Body></SOAP-ENV:Envelope>").encode()
+
+
+class MockRouter:
+    """
+    Class running the emulated TR-064 interface in a background thread
+    """
+
+    def __init__(self, data: RouterData, address: str = "127.0.0.1", port: int = 0, password: str = "secret", latency: float = 0, nonce_lifetime: int = 0, qop: bool = False,
+                 certificate: str = None, key: str = None):
+        """
+        :param data: RouterData to answer requests with
+        :param address: address to listen on
+        :param port: tcp port to listen on, 0 picks a free port
+        :param password: password for digest authentication
+        :param latency: seconds each response is delayed
+        :param nonce_lifetime: number of requests after which the nonce becomes stale, 0 keeps it forever
+        :param qop: send qop="auth" in the challenge (like newer firmware)
+        :param certificate: path to the tls certificate (pem), a self signed one is generated if None
+        :param key: path to the private key of the certificate
+        """
+        self.data = data
+        self.password = password
+        self.latency = latency
+        self.nonce_lifetime = nonce_lifetime
+        self.qop = qop
+        self.nonce = secrets.token_hex(8)
+        self.nonce_uses = 0
+        self.lock = threading.Lock()
+        self.requests = 0  # answered requests (including authentication challenges)
+        self.challenges = 0  # requests answered with 401
+        self.bytes_sent = 0
+
+        if certificate is None:
+            certificate, key = self_signed_certificate()
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certificate, key)
+
+        self.server = ThreadingHTTPServer((address, port), self.handler())
+        self.server.daemon_threads = True
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        self.address, self.port = self.server.server_address[:2]
+        self.thread = None
+
+    def start(self):
+        """
+        Serve requests in a background thread
+        :return: the mock router
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        """
+        Reset the request counters, e.g. before a benchmark run
+        """
+        with self.lock:
+            self.requests = 0
+            self.challenges = 0
+            self.bytes_sent = 0
+
+    def authorized(self, header: str):
+        """
+        Check the digest Authorization header of a request, the nonce is rotated after nonce_lifetime requests
+        :param header: value of the Authorization header, None if not sent
+        :return bool: True if the request may be answered
+        """
+        if header is None:
+            return False
+        fields = dict(re.findall(r"(\w+)=\"?([^\",]*)\"?", header))
+        with self.lock:
+            if fields.get("nonce") != self.nonce:
+                return False
+            if self.nonce_lifetime > 0:
+                self.nonce_uses += 1
+                if self.nonce_uses > self.nonce_lifetime:
+                    self.nonce = secrets.token_hex(8)
+                    self.nonce_uses = 0
+                    return False
+
+        hash1 = hashlib.md5(f"{fields.get('username')}:BT:{self.password}".encode()).hexdigest()
+        hash2 = hashlib.md5(f"POST:{fields.get('uri')}".encode()).hexdigest()
+        if "qop" in fields:
+            expected = hashlib.md5(f"{hash1}:{fields['nonce']}:{fields.get('nc')}:{fields.get('cnonce')}:{fields['qop']}:{hash2}".encode()).hexdigest()
+        elif self.qop:
+            return False
+        else:
+            expected = hashlib.md5(f"{hash1}:{fields['nonce']}:{hash2}".encode()).hexdigest()
+        return fields.get("username") == "dslf-config" and fields.get("response") == expected
+
+    def handler(self):
+        """
+        :return: request handler class bound to this mock router
+        """
+        router = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the speedport
+            disable_nagle_algorithm = True  # headers and body are written separately, don't wait for the delayed ack
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                if router.latency > 0:
+                    time.sleep(router.latency)
+
+                if not router.authorized(self.headers.get("Authorization")):
+                    challenge = f"Digest realm=\"BT\", nonce=\"{router.nonce}\"" + (", qop=\"auth\"" if router.qop else "")
+                    with router.lock:
+                        router.requests += 1
+                        router.challenges += 1
+                    self.send_response(401)
+                    self.send_header("WWW-Authenticate", challenge)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                names = [name.strip() for name in re.findall(r"<xsd:string>(.*?)</xsd:string>", body, re.S)]
+                values, unknown = router.data.values(names)
+                if unknown is None:
+                    status, document = 200, response_document(values)
+                else:
+                    status, document = 500, fault_document(9005, f"Invalid parameter name {unknown}")
+
+                with router.lock:
+                    router.requests += 1
+                    router.bytes_sent += len(document)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(document)))
+                self.end_headers()
+                self.wfile.write(document)
+
+            def log_message(self, format, *args):  # no log line for every request
+                pass
+
+        return Handler
+
+
+def self_signed_certificate():
+    """
+    Generate a self signed certificate with openssl, like the speedport uses
+    :return: tuple (certificate path, key path)
+    """
+    directory = tempfile.mkdtemp(prefix="speedport-mock-")
+    certificate = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=speedport.ip", "-keyout", key, "-out", certificate],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return certificate, key
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock speedport TR-064 interface")
+    parser.add_argument("-a", "--address", help="Address to listen on", default="127.0.0.1")
+    parser.add_argument("-P", "--port", help="Port to listen on", type=int, default=49443)
+    parser.add_argument("-p", "--password", help="Password for digest authentication", default="secret")
+    parser.add_argument("--interfaces", help="Number of wifi interfaces", type=int, default=7)
+    parser.add_argument("--clients", help="Number of clients per up interface", type=int, default=3)
+    parser.add_argument("--hosts", help="Number of entries in the host table", type=int, default=40)
+    parser.add_argument("--log-lines", help="Number of log lines", type=int, default=300)
+    parser.add_argument("--latency", help="Delay of each response in milliseconds", type=float, default=0)
+    parser.add_argument("--nonce-lifetime", help="Number of requests after which the nonce becomes stale, 0 for never", type=int, default=0)
+    parser.add_argument("--qop", help="Send qop=auth in the digest challenge", action="store_true")
+    parser.add_argument("--cert", help="TLS certificate (pem), self signed if not given", default=None)
+    parser.add_argument("--key", help="Private key of the certificate", default=None)
+    args = parser.parse_args()
+
+    data = RouterData(args.interfaces, clients=args.clients, hosts=args.hosts, log_lines=args.log_lines)
+    router = MockRouter(data, args.address, args.port, args.password, args.latency / 1000, args.nonce_lifetime, args.qop, args.cert, args.key)
+    print(f"[i] Mock speedport listening on https://{router.address}:{router.port}/ (password {args.password})")
+    try:
+        router.server.serve_forever()
+    except KeyboardInterrupt:
+        router.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Cold start benchmark for the command line interface.
+Every subcommand is started in a fresh interpreter, the wall time is measured and the modules it imports are recorded with -X importtime.
+Exits with code 1 if a subcommand imports a module it shouldn't need (e.g. requests for --version) or exceeds the given time budget.
+
+Subcommands which query the router need a reachable router (or a mock), the import time is measured even if the request fails:
+    $ python benchmarks/startup.py -a 192.168.2.1 -p password
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "speedport.py")
+
+# modules which are only needed to query the router, to print tables or to serve metrics
+NETWORK_MODULES = {"requests", "urllib3"}
+TABLE_MODULES = {"tabulate"}
+SERVER_MODULES = {"http.server"}
+
+# name -> (command line arguments, modules which must not be imported, True if the router is queried)
+SUBCOMMANDS = {
+    "help": (["-h"], NETWORK_MODULES | TABLE_MODULES | SERVER_MODULES, False),
+    "version": (["--version"], NETWORK_MODULES | TABLE_MODULES | SERVER_MODULES, False),
+    "log-cached": (["-l", "10", "--cached"], NETWORK_MODULES | TABLE_MODULES | SERVER_MODULES, False),
+    "wifi": (["-w"], SERVER_MODULES, True),
+    "wifi-json": (["-w", "-o", "json"], TABLE_MODULES | SERVER_MODULES, True),
+    "ips": (["-ip", "e"], TABLE_MODULES | SERVER_MODULES, True),
+    "log": (["-l", "10"], TABLE_MODULES | SERVER_MODULES, True),
+}
+
+
+def parse_import_times(stderr: str):
+    """
+    Parse the output of -X importtime
+    :param stderr: stderr of the interpreter
+    :return: dictionary module name -> self time in microseconds
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(self_time)
+    return modules
+
+
+def run(arguments, import_time: bool, environment: dict):
+    """
+    Start an interpreter
+    :param arguments: arguments for the interpreter (after the options)
+    :param import_time: record imports with -X importtime
+    :param environment: environment variables
+    :return: tuple (wall time in seconds, stderr)
+    """
+    options = ["-X", "importtime"] if import_time else []
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable] + options + arguments, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=environment)
+    return time.perf_counter() - start, process.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark for speedport.py")
+    parser.add_argument("-a", "--address", help="Address of the router (or mock) for subcommands which query it", default="127.0.0.1")
+    parser.add_argument("-p", "--password", help="Password of the router", default="")
+    parser.add_argument("-r", "--runs", help="Number of runs per subcommand, the median is reported", type=int, default=5)
+    parser.add_argument("-s", "--subcommand", help="Only run the given subcommands", choices=SUBCOMMANDS, action="append")
+    parser.add_argument("--offline", help="Only run subcommands which don't query the router", action="store_true")
+    parser.add_argument("--max-import-ms", help="Fail if the imports of a subcommand (beyond the bare interpreter) take longer", type=float, default=None)
+    args = parser.parse_args()
+
+    # the log store of the benchmark runs is kept apart from the users one
+    environment = dict(os.environ, XDG_CACHE_HOME=tempfile.mkdtemp(prefix="speedport-bench-"))
+
+    # modules the bare interpreter imports anyway (site, encodings, ...) are not counted
+    baseline_time = statistics.median(run(["-c", "pass"], False, environment)[0] for x in range(args.runs))
+    baseline_modules = parse_import_times(run(["-c", "pass"], True, environment)[1])
+    print(f"bare interpreter: {baseline_time * 1000:.1f} ms")
+
+    failed = False
+    print(f"{'subcommand':<12} {'wall (ms)':>10} {'imports (ms)':>13} {'modules':>8}  forbidden imports")
+    for name in args.subcommand or SUBCOMMANDS:
+        arguments, forbidden, online = SUBCOMMANDS[name]
+        if online and args.offline:
+            continue
+
+        arguments = [SCRIPT, "-a", args.address, "-p", args.password] + arguments
+        wall_time = statistics.median(run(arguments, False, environment)[0] for x in range(args.runs))
+        modules = {module: self_time for module, self_time in parse_import_times(run(arguments, True, environment)[1]).items() if module not in baseline_modules}
+        import_ms = sum(modules.values()) / 1000
+
+        imported = sorted(module for module in forbidden if module in modules)
+        if len(imported) > 0 or (args.max_import_ms is not None and import_ms > args.max_import_ms):
+            failed = True
+        print(f"{name:<12} {wall_time * 1000:>10.1f} {import_ms:>13.1f} {len(modules):>8}  {', '.join(imported)}")
+
+    if failed:
+        print("[-] startup check failed")
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,37 @@
-from .wifi import WifiInterface
-from .wifi import WifiClient
+# re-exported classes, the modules are imported on first access, so importing a single module doesn't load all others (e.g. requests)
+_EXPORTS = {
+    "WifiInterface": "wifi",
+    "WifiClient": "wifi",
+    "ClientTable": "wifi",
+    "SoapSession": "soap",
+    "SoapFault": "soap",
+    "ParameterTree": "tree",
+    "ClientPoller": "poller",
+    "ScreenRenderer": "poller",
+    "Router": "fleet",
+    "LogStore": "logstore",
+    "LogAnalyzer": "loganalytics",
+    "classify_line": "logparser",
+    "RecordWriter": "output",
+    "ResponseCache": "cache",
+    "RequestPlanner": "planner",
+    "Profiler": "profiling",
+    "SpeedportClient": "client",
+    "ClientRecorder": "recorder",
+    "RequestScheduler": "scheduler",
+    "EnvelopeBuilder": "envelope",
+    "HostIndex": "hosts",
+    "Watcher": "watcher",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value  # later accesses don't need __getattr__
+    return value
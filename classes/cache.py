@@ -0,0 +1,132 @@
+import collections
+import re
+import threading
+import time
+
+# time (seconds) parameters are cached, {i} matches any instance number and the path is matched as prefix.
+# parameters without entry (e.g. AssociatedDevice, Hosts, DeviceLog) are volatile and always requested
+DEFAULT_TTLS = {
+    "Device.WiFi.SSID.{i}.SSID": 300,
+    "Device.WiFi.SSID.{i}.BSSID": 3600,
+    "Device.WiFi.SSID.{i}.Status": 5,
+    "Device.WiFi.Radio.{i}.SupportedFrequencyBands": 3600,
+    "Device.WiFi.Radio.{i}.MaxBitRate": 300,
+    "Device.WiFi.Radio.{i}.Channel": 60,
+    "Device.WiFi.Radio.{i}.TransmitPower": 60,
+    "Device.WiFi.AccessPoint.{i}.Security.": 300,
+    "Device.IP.Interface.{i}.Alias": 3600,
+    "Device.DeviceInfo.ModelName": 3600,
+    "Device.DeviceInfo.Manufacturer": 3600,
+    "Device.DeviceInfo.SerialNumber": 3600,
+    "Device.DeviceInfo.HardwareVersion": 3600,
+    "Device.DeviceInfo.SoftwareVersion": 300,
+}
+
+
+def parse_ttl(option: str):
+    """
+    Parse a ttl option given on the command line
+    :param option: string like Device.WiFi.SSID.{i}.SSID=600
+    :return: tuple (path, ttl in seconds)
+    """
+    path, ttl = option.rsplit("=", 1)
+    return path, float(ttl)
+
+
+class ResponseCache:
+    """
+    Class caching parameter values by requested parameter name, with a time to live per path prefix and LRU eviction.
+    Partial paths (ending with a dot) are cached with all values returned for them.
+    """
+
+    def __init__(self, ttls: dict = None, max_entries: int = 1024):
+        """
+        :param ttls: dictionary path prefix -> seconds, defaults to DEFAULT_TTLS
+        :param max_entries: max. number of cached parameters, the least recently used one is removed first
+        """
+        if ttls is None:
+            ttls = DEFAULT_TTLS
+
+        # compile prefixes once, longer (more specific) prefixes are checked first
+        self.ttls = []
+        for path in sorted(ttls, key=len, reverse=True):
+            pattern = re.compile(re.escape(path).replace(re.escape("{i}"), r"\d+"))
+            self.ttls.append((pattern, ttls[path]))
+
+        self.parameter_ttls = {}  # parameter name -> ttl, saves matching the patterns again
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()  # parameter name -> (expiry time, list of (name, value))
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def ttl(self, parameter: str):
+        """
+        Get the time to live for a parameter
+        :param parameter: requested parameter name
+        :return: seconds, 0 if the parameter isn't cached
+        """
+        if parameter not in self.parameter_ttls:
+            self.parameter_ttls[parameter] = 0
+            for pattern, ttl in self.ttls:
+                if pattern.match(parameter):
+                    self.parameter_ttls[parameter] = ttl
+                    break
+        return self.parameter_ttls[parameter]
+
+    def get(self, parameter: str):
+        """
+        Get cached values of a parameter
+        :param parameter: requested parameter name
+        :return: list of (name, value) tuples or None, if not cached or expired
+        """
+        with self.lock:
+            entry = self.entries.get(parameter)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(parameter)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, parameter: str, values):
+        """
+        Cache the values of a parameter, if it has a ttl
+        :param parameter: requested parameter name
+        :param values: list of (name, value) tuples returned for the parameter
+        """
+        ttl = self.ttl(parameter)
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[parameter] = (time.monotonic() + ttl, values)
+            self.entries.move_to_end(parameter)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        """
+        :return str: hit/miss counters
+        """
+        total = self.hits + self.misses
+        return f"{self.hits} hits, {self.misses} misses ({self.hits / total * 100 if total > 0 else 0:.0f}% hit rate), {len(self.entries)} entries"
+
+
+def group_by_parameter(parameter_list, values):
+    """
+    Assign response values to the requested parameters
+    :param parameter_list: requested parameter names, full names or partial paths (ending with a dot)
+    :param values: iterable of (name, value) tuples of the response
+    :return: dictionary requested parameter -> list of (name, value)
+    """
+    groups = {parameter: [] for parameter in parameter_list}
+    partial_paths = [parameter for parameter in parameter_list if parameter.endswith(".")]
+    for name, value in values:
+        if name in groups:
+            groups[name].append((name, value))
+            continue
+        for path in partial_paths:
+            if name.startswith(path):
+                groups[path].append((name, value))
+                break
+    return groups
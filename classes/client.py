@@ -0,0 +1,217 @@
+import threading
+
+from . import cache
+from . import commands
+from .envelope import EnvelopeBuilder, soap_action
+from .hosts import HostIndex
+from . import logstore
+from .planner import RequestPlanner
+from .profiling import Profiler
+from .scheduler import CircuitBreaker, RequestScheduler
+from .soap import INVALID_PARAMETER_NAME, SoapFault, SoapSession, is_transient, iter_parameter_values
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Speedport-Pro-CLI/0.2.0 (Python)",
+    "Accept": "*/*",
+    "SOAPAction": soap_action("GetParameterValues"),
+    "Content-Type": "text/xml; charset=utf-8"
+}
+DEFAULT_TIMEOUT = (5, 30)  # seconds to wait for the connection and for each read, the syslog of a busy router takes a while
+
+
+class SpeedportClient:
+    """
+    Class querying a single speedport over its TR-064 (SOAP) interface.
+    The client owns the connection pool, credentials, authentication state and parameter cache of the router, it doesn't use any global state.
+    A client can be shared between threads: requests of all threads reuse the same connections and the cached digest nonce.
+    """
+
+    def __init__(self, address: str = "192.168.2.1", password: str = None, port: int = 49443, headers: dict = None, max_concurrent_requests: int = 4,
+                 max_parameters: int = 64, timeout=DEFAULT_TIMEOUT, cache: cache.ResponseCache = None, profiler: Profiler = None, scheduler: RequestScheduler = None):
+        """
+        :param address: ip address or host name of the speedport
+        :param password: password of the web interface, None if the router doesn't request authentication
+        :param port: port of the TR-064 interface
+        :param headers: http headers sent with each request, defaults to DEFAULT_HEADERS
+        :param max_concurrent_requests: max. number of parallel requests to the speedport (size of the connection pool)
+        :param max_parameters: max. number of parameter names merged into one request
+        :param timeout: seconds to wait for the router, or tuple of connect and read timeout, None waits forever
+        :param cache: cache.ResponseCache for static parameters, None requests all parameters every time
+        :param profiler: Profiler measuring the request phases, None to disable profiling
+        :param scheduler: RequestScheduler with the retry, rate limit and circuit breaker settings, None for 2 retries and a circuit breaker without rate limit
+        """
+        self.address = address
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_parameters = max_parameters
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        self.cache = cache  # cache.ResponseCache for parameter values of this router, None to disable caching
+        self.envelopes = EnvelopeBuilder()  # encoded request bodies, parameter names of a poll repeat
+        self.hosts = HostIndex(max_parameters=max_parameters)  # mac address -> host table entry, only the entries of the clients are requested after the first poll
+        self.hosts_lock = threading.Lock()  # lookups of the host index must not run at the same time
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler(breaker=CircuitBreaker(), is_transient=is_transient)
+        self.session = SoapSession(address, password, headers if headers is not None else DEFAULT_HEADERS, port=port, pool_size=max_concurrent_requests,
+                                   timeout=timeout, profiler=self.profiler)
+
+    def close(self):
+        """
+        Close the connections to the router
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def request(self, parameter_list):
+        """
+        Method to get soap data for given parameters
+        :param parameter_list: list of string parameters, to specify data to get
+        :return: generator yielding (name, value) tuples of the response, the body is parsed while it is received
+        """
+        if len(parameter_list) == 0:
+            return iter(())
+        response_cache = self.cache
+
+        # values of static parameters are taken from the cache, only missing ones are requested
+        cached_values = {}
+        if response_cache is not None:
+            for parameter in parameter_list:
+                if response_cache.ttl(parameter) > 0:
+                    values = response_cache.get(parameter)
+                    if values is not None:
+                        cached_values[parameter] = values
+        requested_list = [parameter for parameter in parameter_list if parameter not in cached_values]
+
+        if len(requested_list) > 0:
+            values = self.send_request(requested_list)
+            if response_cache is None or not any(response_cache.ttl(parameter) > 0 for parameter in parameter_list):
+                return values  # nothing to cache, stream the response
+
+            # store new values, so they can be merged with the cached ones in the requested order
+            for parameter, group in cache.group_by_parameter(requested_list, values).items():
+                response_cache.put(parameter, group)
+                cached_values[parameter] = group
+
+        return (value for parameter in parameter_list for value in cached_values[parameter])
+
+    def send_request(self, parameter_list):
+        """
+        Send a GetParameterValues request, without using the cache
+        :param parameter_list: list of string parameters, to specify data to get
+        :return: generator yielding (name, value) tuples of the response, the body is parsed while it is received
+        """
+        data = self.envelopes.get_parameter_values(parameter_list)
+
+        # send request with data over the persistent session, which handles (cached) digest authentication
+        # GetParameterValues is idempotent, so the scheduler may repeat it if the router timed out or was overloaded
+        request = self.scheduler.call(lambda: self.session.post(data, stream=True))
+        chunks = self.profiler.iterate("receive", request.iter_content(chunk_size=16384))
+        return self.profiler.iterate("parse", iter_parameter_values(chunks))
+
+    def run_concurrently(self, functions):
+        """
+        Run independent functions (e.g. soap queries) at the same time, with a bounded number of parallel requests
+        :param functions: list of callables without arguments
+        :return: list with the return values, in the same order as the given functions
+        """
+        if len(functions) <= 1:
+            return [function() for function in functions]
+
+        import concurrent.futures
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(functions), self.max_concurrent_requests)) as executor:
+            futures = [executor.submit(function) for function in functions]
+            return [future.result() for future in futures]
+
+    def run(self, command_list):
+        """
+        Run planner commands together, parameters needed by the commands at the same step are merged into as few requests as possible
+        :param command_list: list of command generator objects, e.g. [commands.wifi_interfaces(), commands.external_ips()]
+        :return: list with the results of the commands, in the same order
+        """
+        return RequestPlanner(self.request, self.run_concurrently, self.max_parameters, self.profiler).run(command_list)
+
+    def wifi_interfaces(self):
+        """
+        Get information about all available WiFi interfaces
+        :return: list with wifi.WifiInterface
+        """
+        return self.run([commands.wifi_interfaces()])[0]
+
+    def wifi_interface(self, interface_id: int):
+        """
+        Get information about a single WiFi interface
+        :param interface_id: internal speedport interface id
+        :return: the interface or None, if there is no interface with the given id
+        """
+        for interface in self.wifi_interfaces():
+            if interface.id == interface_id:
+                return interface
+        return None
+
+    def wifi_clients(self, interface):
+        """
+        Get all clients associated to a WiFi interface
+        :param interface: the interface
+        :return: the passed interface, but with completed client list
+        """
+        return self.run_host_lookup(lambda: commands.wifi_clients(interface, self.hosts))
+
+    def all_wifi_clients(self, interfaces=None):
+        """
+        Get the clients of all WiFi interfaces which are up, the host table is requested only once and the interfaces are queried concurrently
+        :param interfaces: list of interfaces, None to request them first
+        :return: list with all interfaces, the ones which are up with completed client list
+        """
+        if interfaces is None:
+            interfaces = self.wifi_interfaces()
+        self.run_host_lookup(lambda: commands.all_wifi_clients([interface for interface in interfaces if interface.up], self.hosts))
+        return interfaces
+
+    def run_host_lookup(self, command):
+        """
+        Run a command using the host index, repeat it with a full read of the host table if an indexed entry was removed meanwhile
+        :param command: callable returning the command generator object
+        :return: result of the command
+        """
+        with self.hosts_lock:
+            try:
+                return self.run([command()])[0]
+            except SoapFault as e:
+                if e.code != INVALID_PARAMETER_NAME or self.hosts.count is None:
+                    raise
+                self.hosts.reset()  # the router rejected a name of the index, the next lookup reads the whole table
+                return self.run([command()])[0]
+
+    def external_ips(self):
+        """
+        Get the speedport's external IPs
+        :return: list of dictionaries with interface name, ip address (empty if not available) and whether it is the public address
+        """
+        return self.run([commands.external_ips()])[0]
+
+    def device_info(self):
+        """
+        Get model, firmware, uptime and dsl sync rates of the speedport, in one request
+        :return: dictionary, see commands.device_info
+        """
+        return self.run([commands.device_info()])[0]
+
+    def syslog_lines(self):
+        """
+        Get the raw syslog of the speedport
+        :return: list of log lines, newest entry first
+        """
+        return self.run([commands.syslog()])[0]
+
+    def syslog_entries(self, entry_count: int = -1, excluded_groups=()):
+        """
+        Get classified syslog entries
+        :param entry_count: number of entries that should be returned, -1 for all
+        :param excluded_groups: message groups which are left out, see logparser.excluded_groups
+        :return: list of logstore.LogEntry, oldest entry first
+        """
+        return logstore.select_entries(self.syslog_lines(), entry_count, excluded_groups)
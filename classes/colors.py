@@ -0,0 +1,28 @@
+# class holding bash color codes for colored output
+class BashColors:
+    default = '\33[39m'
+    reset = '\33[0m'
+    bold = '\33[1m'
+    black = '\33[30m'
+    blue = '\33[34m'
+    magenta = '\33[35m'
+    cyan = '\33[36m'
+    light_red = '\33[91m'
+    light_green = '\33[92m'
+    white = '\33[97m'
+
+    class Background:
+        default = '\33[49m'
+        red = '\33[41m'
+        green = '\33[42m'
+        yellow = '\33[43m'
+        blue = '\33[44m'
+        magenta = '\33[45m'
+        cyan = '\33[46m'
+        light_grey = '\33[47m'
+        dark_grey = '\33[100m'
+        light_green = '\33[102m'
+        light_yellow = '\33[103m'
+        light_magenta = '\33[105m'
+        light_cyan = '\33[106m'
+        white = '\33[107m'
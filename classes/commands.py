@@ -0,0 +1,187 @@
+import time
+
+from . import hosts
+from . import wifi
+
+# commands for the planner.RequestPlanner: generators yielding the parameter names they need next,
+# receiving a ParameterTree with the values and returning their result
+
+
+def integer(value, default: int = -1):
+    """
+    Convert a numeric parameter value
+    :param value: value as sent by the speedport, e.g. "6"; None if missing
+    :param default: value returned if the parameter is missing or not a number (e.g. Auto)
+    :return int: the number
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def wifi_interfaces():
+    """
+    Planner command to get information about all available WiFi interfaces
+    :return: list with interfaces
+    """
+    # first request: retrieve status for all interfaces
+    parameter_list = []
+    for x in range(1, 8):
+        parameter_list.append(f"Device.WiFi.SSID.{x}.Status")
+    parameters = yield parameter_list
+
+    # second request: get bssid (mac) and ssid as well as additional info, if interface is up
+    interfaces = []
+    parameter_list = []
+    for interface_id, fields in sorted(parameters.instances("Device.WiFi.SSID.").items()):
+        interface = wifi.WifiInterface(interface_id=interface_id)  # initialize interface object
+        interface.up = fields["Status"] == "Up"  # set state
+        interfaces.append(interface)
+
+        # add mac address (bssid) and ssid for current interface to parameter list
+        parameter_list.append(f"Device.WiFi.SSID.{interface.id}.SSID")
+        parameter_list.append(f"Device.WiFi.SSID.{interface.id}.BSSID")
+
+        if interface.up:  # get more info, which is only available when interface is uo
+            parameter_list.append(f"Device.WiFi.Radio.{interface.id}.SupportedFrequencyBands")  # frequency
+            parameter_list.append(f"Device.WiFi.Radio.{interface.id}.Channel")  # channel
+            parameter_list.append(f"Device.WiFi.Radio.{interface.id}.TransmitPower")  # transmit power
+            parameter_list.append(f"Device.WiFi.Radio.{interface.id}.MaxBitRate")  # max bitrate
+            parameter_list.append(f"Device.WiFi.AccessPoint.{interface.id}.Security.ModeEnabled")  # encryption method used
+
+    parameters = yield parameter_list  # request for additional info
+
+    # add missing information to the interface objects, entries are looked up by interface id
+    ssids = parameters.instances("Device.WiFi.SSID.")
+    radios = parameters.instances("Device.WiFi.Radio.")
+    access_points = parameters.instances("Device.WiFi.AccessPoint.")
+    for interface in interfaces:
+        ssid = ssids.get(interface.id, {})
+        radio = radios.get(interface.id, {})
+        access_point = access_points.get(interface.id, {})
+
+        interface.ssid = ssid.get("SSID", interface.ssid)
+        interface.mac_address = ssid.get("BSSID") or "NA"
+        interface.frequency = radio.get("SupportedFrequencyBands", interface.frequency)
+        interface.channel = integer(radio.get("Channel"), interface.channel)
+        interface.power = integer(radio.get("TransmitPower"), interface.power)
+        interface.data_rate_max = integer(radio.get("MaxBitRate"), interface.data_rate_max)
+        interface.encryption = access_point.get("Security.ModeEnabled", interface.encryption)
+    return interfaces
+
+
+def wifi_clients(interface, host_index: hosts.HostIndex = None):
+    """
+    Planner command to get all clients associated to a WiFi interface
+    :param interface: the interface
+    :param host_index: hosts.HostIndex kept between polls, None to read the whole host table
+    :return: the passed interface, but with completed client list
+    """
+    return (yield from all_wifi_clients([interface], host_index))[0]
+
+
+def all_wifi_clients(interfaces, host_index: hosts.HostIndex = None):
+    """
+    Planner command to get the clients of several WiFi interfaces, the host table is requested only once for all of them
+    :param interfaces: list of interfaces, usually the ones which are up
+    :param host_index: hosts.HostIndex kept between polls, None to read the whole host table
+    :return: the passed interfaces, but with completed client lists
+    """
+    # associated devices and host table don't depend on each other, the planner sends all partial paths at the same time
+    parameter_list = [f"Device.WiFi.AccessPoint.{interface.id}.AssociatedDevice." for interface in interfaces]
+    if host_index is None:
+        parameters = yield parameter_list + [hosts.HOST_TABLE]
+    else:  # only the size of the host table, the entries of the clients are requested once their mac addresses are known
+        parameters = yield parameter_list + [hosts.HOST_COUNT]
+
+    for interface in interfaces:
+        clients = []
+        for client_id, fields in sorted(parameters.instances(f"Device.WiFi.AccessPoint.{interface.id}.AssociatedDevice.").items()):
+            client = wifi.WifiClient(client_id=client_id)
+            client.mac_address = fields.get("MACAddress", client.mac_address)
+            client.downstream_speed = integer(fields.get("LastDataDownlinkRate"), client.downstream_speed)
+            client.upstream_speed = integer(fields.get("LastDataUplinkRate"), client.upstream_speed)
+            client.signal_strength = integer(fields.get("SignalStrength"), client.signal_strength)
+            clients.append(client)
+        interface.clients = clients
+
+    # device data, joined to the clients of all interfaces by mac address
+    if host_index is None:
+        table = parameters.instances(hosts.HOST_TABLE)
+        host_numbers = parameters.index(hosts.HOST_TABLE, "PhysAddress")  # mac address -> host list number
+        host_entries = {mac_address: table[instance] for mac_address, instance in host_numbers.items()}
+    else:
+        count = parameters.get(hosts.HOST_COUNT)
+        host_entries = yield from host_index.lookup([client.mac_address for interface in interfaces for client in interface.clients],
+                                                    int(count) if count.isdigit() else None)
+        host_numbers = host_index.instances
+
+    for interface in interfaces:
+        for client in interface.clients:
+            host = host_entries.get(client.mac_address)
+            if host is None:
+                continue
+            client.host_list_number = host_numbers[client.mac_address]
+            client.ip_address = host.get("IPAddress") or "NA"
+            client.host_name = host.get("HostName") or "NA"
+            client.active = host.get("Active") == "true"
+    return interfaces
+
+
+def external_ips():
+    """
+    Planner command to get the speedport's external IPs
+    :return: list of dictionaries with interface name, ip address (empty if not available) and whether it is the public address
+    """
+    parameter_list = []
+    for x in range(2, 6):
+        parameter_list.append(f"Device.IP.Interface.{x}.Alias")
+        parameter_list.append(f"Device.IP.Interface.{x}.IPv4Address.1.IPAddress")
+        # parameter_list.append(f"Device.IP.Interface.{x}.IPv6Address.1.IPAddress")
+    parameters = yield parameter_list
+
+    # merge ip data rows
+    addresses = []
+    for x in range(2, 6):
+        alias = parameters.get(f"Device.IP.Interface.{x}.Alias")
+        address = parameters.get(f"Device.IP.Interface.{x}.IPv4Address.1.IPAddress")
+        addresses.append({"interface": alias, "address": address, "public": alias == "BOND" and address != ""})
+    return addresses
+
+
+def syslog():
+    """
+    Planner command to get the raw syslog of the speedport
+    :return: list of log lines, newest entry first
+    """
+    parameters = yield ["Device.DeviceInfo.X_T-ONLINE-DE_DeviceLog"]
+    return [line for line in parameters.get("Device.DeviceInfo.X_T-ONLINE-DE_DeviceLog").split("\n") if line != ""]
+
+
+# device info parameters -> result keys
+DEVICE_INFO = {
+    "Device.DeviceInfo.ModelName": "model",
+    "Device.DeviceInfo.Manufacturer": "manufacturer",
+    "Device.DeviceInfo.SerialNumber": "serial_number",
+    "Device.DeviceInfo.HardwareVersion": "hardware_version",
+    "Device.DeviceInfo.SoftwareVersion": "software_version",
+    "Device.DeviceInfo.UpTime": "uptime",
+    "Device.DSL.Channel.1.DownstreamCurrRate": "downstream_rate",
+    "Device.DSL.Channel.1.UpstreamCurrRate": "upstream_rate",
+}
+
+
+def device_info():
+    """
+    Planner command to get model, firmware, uptime and dsl sync rates of the speedport
+    :return: dictionary with model, manufacturer, serial number, hardware and software version (strings), uptime (seconds), time of the last boot (unix time)
+             and dsl downstream/upstream rate (kbit/s), numbers are -1 if not available
+    """
+    parameters = yield list(DEVICE_INFO)
+
+    info = {key: parameters.get(name) for name, key in DEVICE_INFO.items()}
+    for key in ("uptime", "downstream_rate", "upstream_rate"):
+        info[key] = integer(info[key])
+    info["boot_time"] = int(time.time()) - info["uptime"] if info["uptime"] != -1 else -1
+    return info
@@ -0,0 +1,83 @@
+# SOAP envelope around a cwmp action, split at the action body, so only the parameters have to be encoded per request
+ENVELOPE_START = ("<soap-env:Envelope xmlns:soap-env=\"http://schemas.xmlsoap.org/soap/envelope/\" xmlns:xsi=\"http://www.w3.org/2001/XMLSchema-instance\" "
+                  "xmlns:xsd=\"http://www.w3.org/2001/XMLSchema\" xmlns:cwmp=\"urn:telekom-de.totr64-2-n\"><soap-env:Body>").encode()
+ENVELOPE_END = b"</soap-env:Body></soap-env:Envelope>"
+SERVICE = "urn:telekom-de:device:TO_InternetGatewayDevice:2"
+
+
+def escape(text: str):
+    """
+    Escape text for xml element content (xml.sax.saxutils would import urllib and http on startup)
+    :param text: text
+    :return str: escaped text
+    """
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def soap_action(action: str):
+    """
+    :param action: cwmp action, e.g. GetParameterValues
+    :return str: value of the SOAPAction header
+    """
+    return f"{SERVICE}#{action}"
+
+
+class EnvelopeBuilder:
+    """
+    Class building SOAP request bodies for cwmp actions (GetParameterValues, SetParameterValues).
+    The constant parts of the envelope are encoded once and the escaped, encoded form of each parameter name is cached,
+    so a request body is only joined from bytes. Parameter names of a poll repeat, the cache stays small.
+    """
+
+    def __init__(self, max_cached_names: int = 4096):
+        """
+        :param max_cached_names: max. number of encoded parameter names kept, the cache is cleared if it gets bigger
+        """
+        self.max_cached_names = max_cached_names
+        self.names = {}  # parameter name -> encoded <xsd:string> element
+        self.actions = {}  # action -> tuple (envelope up to the action body, rest of the envelope)
+
+    def encoded_name(self, name: str):
+        """
+        :param name: parameter name
+        :return bytes: escaped parameter name in a xsd:string element
+        """
+        element = self.names.get(name)
+        if element is None:
+            if len(self.names) >= self.max_cached_names:
+                self.names.clear()
+            element = self.names[name] = f"<xsd:string>{escape(name)}</xsd:string>".encode()
+        return element
+
+    def action(self, action: str, content: bytes):
+        """
+        Wrap the body of a cwmp action into the envelope
+        :param action: cwmp action, e.g. GetParameterValues
+        :param content: encoded children of the action element
+        :return bytes: request body
+        """
+        parts = self.actions.get(action)
+        if parts is None:
+            parts = self.actions[action] = (ENVELOPE_START + f"<cwmp:{action} xmlns:cwmp=\"urn:dslforum-org:cwmp-1-0\">".encode(), f"</cwmp:{action}>".encode() + ENVELOPE_END)
+        return b"".join((parts[0], content, parts[1]))
+
+    def get_parameter_values(self, parameter_list):
+        """
+        Build a GetParameterValues request
+        :param parameter_list: list of parameter names (full names or partial paths ending with a dot)
+        :return bytes: request body
+        """
+        names = b"".join([self.encoded_name(name) for name in parameter_list])
+        return self.action("GetParameterValues", b"".join((f"<cwmp:ParameterNames length=\"{len(parameter_list)}\">".encode(), names, b"</cwmp:ParameterNames>")))
+
+    def set_parameter_values(self, values: dict, parameter_key: str = ""):
+        """
+        Build a SetParameterValues request
+        :param values: dictionary parameter name -> value, values are sent as xsd:string
+        :param parameter_key: key the router stores with the change, to identify it later
+        :return bytes: request body
+        """
+        structs = "".join(f"<ParameterValueStruct><Name>{escape(name)}</Name><Value xsi:type=\"xsd:string\">{escape(str(value))}</Value></ParameterValueStruct>"
+                          for name, value in values.items())
+        return self.action("SetParameterValues", f"<cwmp:ParameterList length=\"{len(values)}\">{structs}</cwmp:ParameterList>"
+                                                 f"<cwmp:ParameterKey>{escape(parameter_key)}</cwmp:ParameterKey>".encode())
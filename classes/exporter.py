@@ -0,0 +1,183 @@
+import threading
+import time
+
+
+class Metric:
+    """
+    Class representing a gauge (or counter) with its samples, in the Prometheus text format
+    """
+    __slots__ = ("name", "help", "type", "samples")
+
+    def __init__(self, name: str, help: str, type: str = "gauge"):
+        self.name: str = name
+        self.help: str = help
+        self.type: str = type  # gauge or counter
+        self.samples: list = []  # list of (labels dictionary, value)
+
+    def add(self, value, **labels):
+        """
+        Add a sample
+        :param value: numeric value
+        :param labels: label name -> label value
+        """
+        self.samples.append((labels, value))
+
+
+def escape_label(value):
+    """
+    Escape a label value for the text format
+    :param value: label value
+    :return str: escaped value
+    """
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_metrics(metrics):
+    """
+    Format metrics in the Prometheus text exposition format
+    :param metrics: list of Metric
+    :return str: exposition text
+    """
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for labels, value in metric.samples:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):  # e.g. empty value sent by the router
+                continue
+            label_string = ",".join(f"{name}=\"{escape_label(label)}\"" for name, label in labels.items())
+            lines.append(f"{metric.name}{{{label_string}}} {value}" if label_string != "" else f"{metric.name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def wifi_metrics(interfaces):
+    """
+    Build metrics for WiFi interfaces and their clients
+    :param interfaces: list of wifi.WifiInterface, with completed client lists for interfaces which are up
+    :return: list of Metric
+    """
+    up = Metric("speedport_wifi_interface_up", "State of the wifi interface (1 = up)")
+    channel = Metric("speedport_wifi_interface_channel", "Channel of the wifi interface")
+    power = Metric("speedport_wifi_interface_transmit_power_percent", "Transmit power of the wifi interface in percent")
+    clients = Metric("speedport_wifi_interface_clients", "Number of clients associated with the wifi interface")
+    signal = Metric("speedport_wifi_client_signal_strength_dbm", "Signal strength of the client, measured by the speedport")
+    downstream = Metric("speedport_wifi_client_downstream_rate_kbps", "Last data downlink rate of the client")
+    upstream = Metric("speedport_wifi_client_upstream_rate_kbps", "Last data uplink rate of the client")
+
+    for interface in interfaces:
+        labels = {"interface": interface.id, "ssid": interface.ssid, "frequency": interface.frequency}
+        up.add(1 if interface.up else 0, **labels)
+        if not interface.up:
+            continue
+
+        channel.add(interface.channel, **labels)
+        power.add(interface.power, **labels)
+        clients.add(len(interface.clients), **labels)
+        for client in interface.clients:
+            client_labels = {"interface": interface.id, "mac": client.mac_address, "host": client.host_name}
+            signal.add(client.signal_strength, **client_labels)
+            downstream.add(client.downstream_speed, **client_labels)
+            upstream.add(client.upstream_speed, **client_labels)
+    return [up, channel, power, clients, signal, downstream, upstream]
+
+
+def ip_metrics(addresses):
+    """
+    Build metrics for the external ip addresses
+    :param addresses: list of dictionaries, as returned by get_external_ip_list
+    :return: list of Metric
+    """
+    connected = Metric("speedport_external_interface_connected", "1 if the external interface has an ipv4 address")
+    for entry in addresses:
+        connected.add(1 if entry["address"] != "" else 0, interface=entry["interface"], address=entry["address"], public=str(entry["public"]).lower())
+    return [connected]
+
+
+def profile_metrics(profiler):
+    """
+    Build metrics for the measured request phases (connect, auth, send, receive, parse, merge, ...)
+    :param profiler: profiling.Profiler of the exporter
+    :return: list of Metric
+    """
+    seconds = Metric("speedport_phase_seconds_total", "Time spent in the phase (without nested phases), since the exporter started", "counter")
+    calls = Metric("speedport_phase_calls_total", "Number of times the phase was measured, since the exporter started", "counter")
+    for entry in profiler.report():
+        seconds.add(entry["self_ms"] / 1000, phase=entry["name"])
+        calls.add(entry["calls"], phase=entry["name"])
+    return [seconds, calls]
+
+
+class ScrapeCache:
+    """
+    Class caching the result of a scrape for a given time, so concurrent or frequent scrapes don't multiply the requests to the router.
+    Only one scrape collects at a time, others wait for its result.
+    """
+
+    def __init__(self, collect, ttl: float):
+        """
+        :param collect: callable without arguments returning a list of Metric
+        :param ttl: seconds a result is reused
+        """
+        self.collect = collect
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.text = None
+        self.timestamp = 0
+
+    def get(self):
+        """
+        Get the exposition text, collect metrics if the cached result is too old
+        :return str: exposition text
+        """
+        with self.lock:
+            if self.text is None or time.monotonic() - self.timestamp >= self.ttl:
+                start = time.monotonic()
+                success = 1
+                try:
+                    metrics = self.collect()
+                except (Exception, SystemExit):  # router not reachable, reported with speedport_scrape_success
+                    metrics = []
+                    success = 0
+
+                scrape = Metric("speedport_scrape_success", "1 if the last collection from the router succeeded")
+                scrape.add(success)
+                duration = Metric("speedport_scrape_duration_seconds", "Time the last collection from the router took")
+                duration.add(time.monotonic() - start)
+
+                self.text = format_metrics(metrics + [scrape, duration])
+                self.timestamp = time.monotonic()
+            return self.text
+
+
+def serve(cache: ScrapeCache, port: int, address: str = ""):
+    """
+    Serve the metrics over http at /metrics, until interrupted
+    :param cache: ScrapeCache providing the metrics
+    :param port: tcp port to listen on
+    :param address: address to listen on, all addresses if empty
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # loaded only in exporter mode, keeps cli startup fast
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+
+            body = cache.get().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # no log line for every scrape
+            pass
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,106 @@
+import configparser
+import threading
+import time
+
+
+class Router:
+    """
+    Class representing a single speedport of the fleet inventory
+    """
+    __slots__ = ("name", "address", "password", "port")
+
+    def __init__(self, name: str, address: str, password: str = None, port: int = None):
+        self.name: str = name
+        self.address: str = address
+        self.password: str = password
+        self.port: int = port  # port of the TR-064 interface, None for the default of the command line
+
+
+class FleetResult:
+    """
+    Class holding the outcome of polling a single router
+    """
+    __slots__ = ("router", "result", "error", "duration")
+
+    def __init__(self, router: Router):
+        self.router: Router = router
+        self.result = None  # return value of the collect function
+        self.error: str = ""  # error message, empty if polling succeeded
+        self.duration: float = -1  # seconds it took to poll the router
+
+
+def read_inventory(path: str):
+    """
+    Read the router inventory file. Each section is a router, e.g.
+    [site-a]
+    address = 10.1.0.1
+    password = secret
+    port = 49443 (optional)
+    :param path: path to the inventory file (ini format)
+    :return: list of routers, in file order
+    """
+    parser = configparser.ConfigParser(interpolation=None)
+    with open(path) as file:
+        parser.read_file(file)
+
+    routers = []
+    for name in parser.sections():
+        section = parser[name]
+        try:
+            port = section.getint("port")
+        except ValueError:
+            raise configparser.Error(f"Invalid port {section.get('port')!r} in section [{name}]")  # reported like other inventory errors
+        routers.append(Router(name, section.get("address", "192.168.2.1"), section.get("password"), port))
+    return routers
+
+
+def poll_fleet(routers, collect, max_workers: int = 8, timeout: float = 30):
+    """
+    Poll all routers at the same time, with a bounded number of worker threads.
+    Each router has its own time limit, counted from the start of its poll. A router which doesn't answer in time is reported
+    as failed and its worker slot is given to the next router; the hanging poll continues in a daemon thread, which doesn't delay the exit.
+    :param routers: list of routers
+    :param collect: callable taking a router and its deadline (time.monotonic() value) and returning the collected data
+    :param max_workers: max. number of routers polled in parallel
+    :param timeout: seconds to wait for a single router
+    :return: list of FleetResult, in the same order as routers
+    """
+    changed = threading.Event()  # set when a poll finished
+
+    def run(attempt: FleetResult, deadline: float):
+        start = time.monotonic()
+        try:
+            attempt.result = collect(attempt.router, deadline)
+        except SystemExit as e:  # exit_with_error_message was called, which must not end the whole sweep
+            attempt.error = f"Aborted with exit code {e.code}"
+        except Exception as e:
+            attempt.error = str(e) or e.__class__.__name__
+        attempt.duration = time.monotonic() - start
+        changed.set()
+
+    results = [FleetResult(router) for router in routers]
+    waiting = list(range(len(results)))  # indices of the routers which weren't started yet
+    running = {}  # index -> (attempt, deadline)
+    max_workers = max(1, max_workers)
+    while len(waiting) > 0 or len(running) > 0:
+        while len(waiting) > 0 and len(running) < max_workers:
+            index = waiting.pop(0)
+            attempt = FleetResult(results[index].router)  # filled by the thread, copied when it finished in time
+            deadline = time.monotonic() + timeout
+            thread = threading.Thread(target=run, args=(attempt, deadline), name=f"fleet-{attempt.router.name}", daemon=True)
+            running[index] = (attempt, deadline)
+            thread.start()
+
+        changed.wait(max(0.0, min(deadline for attempt, deadline in running.values()) - time.monotonic()))
+        changed.clear()
+        now = time.monotonic()
+        for index, (attempt, deadline) in list(running.items()):
+            if attempt.duration >= 0:  # finished, the duration is set before the event
+                results[index] = attempt
+            elif now >= deadline:
+                results[index].error = f"Timeout after {timeout} seconds"
+                results[index].duration = timeout
+            else:
+                continue
+            del running[index]
+    return results
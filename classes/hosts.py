@@ -0,0 +1,112 @@
+HOST_TABLE = "Device.Hosts.Host."
+HOST_COUNT = "Device.Hosts.HostNumberOfEntries"
+HOST_FIELDS = ("PhysAddress", "IPAddress", "HostName", "Active")  # fields needed for the clients, the table has many more
+
+
+class HostIndex:
+    """
+    Class keeping the mac address -> instance number index of the host table (Device.Hosts.Host.) between polls.
+    The host table lists every device ever seen, so instead of downloading all of it on every poll, only the number of entries
+    and the needed fields of the instances of the current clients are requested. The mac address is requested with them,
+    so an instance which now belongs to another device is noticed. The whole table is only read again on the first poll,
+    if entries were removed, if most entries are clients anyway, if the entries of the clients don't fit into one request,
+    or (every rescan_interval polls at most) if a client isn't in the index.
+    If an indexed entry was removed meanwhile, the router rejects the request with fault 9005, the caller has to reset() the index and repeat the lookup.
+    A lookup is run as part of a planner command (yield from), lookups of the same index should not run at the same time.
+    """
+
+    def __init__(self, rescan_interval: int = 30, max_share: float = 0.25, max_parameters: int = 64):
+        """
+        :param rescan_interval: min. number of polls between two full reads of the table, caused by clients without host entry
+        :param max_share: if more than this share of the table entries are clients, the whole table is read, which needs fewer requests
+        :param max_parameters: max. number of parameter names requested instead of the whole table, more names would need several requests
+        """
+        self.rescan_interval = max(1, rescan_interval)
+        self.max_share = max_share
+        self.max_parameters = max_parameters
+        self.instances = {}  # mac address -> instance number
+        self.count = None  # number of entries of the table when it was read, None before the first read
+        self.last_instance = 0  # highest instance number, new entries get higher numbers
+        self.polls = 0  # polls since the last full read
+
+    def reset(self):
+        """
+        Forget the index, the next lookup reads the whole table
+        """
+        self.instances = {}
+        self.count = None
+        self.last_instance = 0
+
+    def rebuild(self, parameters):
+        """
+        Build the index from the whole table
+        :param parameters: ParameterTree with the partial path Device.Hosts.Host.
+        :return: dictionary instance number -> {field name -> value} of the table
+        """
+        table = parameters.instances(HOST_TABLE)
+        self.instances = parameters.index(HOST_TABLE, "PhysAddress")
+        self.count = len(table)
+        self.last_instance = max(table, default=0)
+        self.polls = 0
+        return table
+
+    def lookup(self, mac_addresses, count: int):
+        """
+        Planner sub command getting the host entries of clients, used with yield from
+        :param mac_addresses: mac addresses of the clients
+        :param count: current number of entries of the host table (Device.Hosts.HostNumberOfEntries), None if unknown
+        :return: dictionary mac address -> {field name -> value}, clients without host entry are left out
+        """
+        self.polls += 1
+        unknown = [mac_address for mac_address in mac_addresses if mac_address not in self.instances]
+        if self.count is None or count is None or count < self.count or (len(unknown) > 0 and self.polls >= self.rescan_interval) or \
+                len(mac_addresses) > count * self.max_share:
+            table = self.rebuild((yield [HOST_TABLE]))  # first poll, removed entries, long missing clients or small table: read everything once
+            return {mac_address: table[self.instances[mac_address]] for mac_address in mac_addresses if mac_address in self.instances}
+
+        # new entries are appended to the table, their mac address is enough to index them
+        parameter_list = [f"{HOST_TABLE}{instance}.PhysAddress" for instance in range(self.last_instance + 1, self.last_instance + count - self.count + 1)]
+        parameter_list += self.field_names(mac_addresses)
+        if len(parameter_list) > self.max_parameters:  # many clients, one request for the whole table is faster than several for the entries
+            table = self.rebuild((yield [HOST_TABLE]))
+            return {mac_address: table[self.instances[mac_address]] for mac_address in mac_addresses if mac_address in self.instances}
+
+        requested = set(parameter_list)
+        previous_instance = self.last_instance
+        self.last_instance += count - self.count
+        self.count = count
+        hosts = {}
+        table = {}  # instance number -> fields received so far
+        while len(parameter_list) > 0:
+            parameters = yield parameter_list
+            for instance, fields in parameters.instances(HOST_TABLE).items():
+                table.setdefault(instance, {}).update(fields)
+                mac_address = fields.get("PhysAddress", "")
+                if self.instances.get(mac_address) == instance or mac_address == "":
+                    continue
+                if instance <= previous_instance:  # instance reused for another device, the old device is unknown until the next full read
+                    for known_address, known_instance in list(self.instances.items()):
+                        if known_instance == instance:
+                            del self.instances[known_address]
+                self.instances.setdefault(mac_address, instance)
+
+            # clients which are indexed now, but whose fields weren't requested yet (found in the new entries)
+            missing = []
+            for mac_address in mac_addresses:
+                if mac_address in hosts or mac_address not in self.instances:
+                    continue
+                fields = table.get(self.instances[mac_address], {})
+                if len(fields) == len(HOST_FIELDS) and fields["PhysAddress"] == mac_address:
+                    hosts[mac_address] = fields
+                else:
+                    missing.append(mac_address)
+            parameter_list = [name for name in self.field_names(missing) if name not in requested]
+            requested.update(parameter_list)
+        return hosts
+
+    def field_names(self, mac_addresses):
+        """
+        :param mac_addresses: mac addresses of clients
+        :return: list of the needed parameter names of the host entries of the clients, which are in the index
+        """
+        return [f"{HOST_TABLE}{self.instances[mac_address]}.{field}" for mac_address in mac_addresses if mac_address in self.instances for field in HOST_FIELDS]
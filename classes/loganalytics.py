@@ -0,0 +1,257 @@
+import json
+import re
+import time
+
+from . import logparser
+
+# timestamps of the speedport log (2021-03-15 12:00:00) and of older firmware (15.03.2021 12:00:00)
+TIMESTAMP_PATTERNS = (
+    (re.compile(r"(\d{4})-(\d\d)-(\d\d)[ T](\d\d):(\d\d):(\d\d)"), (0, 1, 2)),
+    (re.compile(r"(\d\d)\.(\d\d)\.(\d{4}),? (\d\d):(\d\d):(\d\d)"), (2, 1, 0)),
+)
+COLOR_PATTERN = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class EventStatistics:
+    """
+    Class counting the events of a message group or code: number, first and last occurrence, events per hour and the time between events
+    """
+    __slots__ = ("count", "first", "last", "hours", "previous", "gaps", "gap_sum", "gap_min", "gap_max")
+
+    def __init__(self):
+        self.count = 0
+        self.first = None  # seconds (local time of the router, as unix time) of the oldest event
+        self.last = None  # seconds of the newest event
+        self.hours = {}  # hour (YYYY-MM-DD HH) -> number of events
+        self.previous = None  # seconds of the previous event of the current log, to compute the gap
+        self.gaps = 0  # number of measured gaps
+        self.gap_sum = 0
+        self.gap_min = None
+        self.gap_max = None
+
+    def add(self, seconds, hour: str):
+        """
+        Count an event
+        :param seconds: time of the event, None if the line has no readable timestamp
+        :param hour: hour bucket of the event, e.g. 2021-03-15 12
+        """
+        self.count += 1
+        if seconds is None:
+            return
+        self.hours[hour] = self.hours.get(hour, 0) + 1
+        if self.first is None or seconds < self.first:
+            self.first = seconds
+        if self.last is None or seconds > self.last:
+            self.last = seconds
+
+        if self.previous is not None:
+            gap = abs(seconds - self.previous)  # the router sends the newest entry first, stored logs are oldest first
+            self.gaps += 1
+            self.gap_sum += gap
+            self.gap_min = gap if self.gap_min is None else min(self.gap_min, gap)
+            self.gap_max = gap if self.gap_max is None else max(self.gap_max, gap)
+        self.previous = seconds
+
+    def merge(self, other):
+        """
+        Add the statistics of another log, e.g. of another router (gaps between the logs are not counted)
+        :param other: EventStatistics
+        """
+        self.count += other.count
+        for hour, count in other.hours.items():
+            self.hours[hour] = self.hours.get(hour, 0) + count
+        self.first = optional(min, self.first, other.first)
+        self.last = optional(max, self.last, other.last)
+        self.gaps += other.gaps
+        self.gap_sum += other.gap_sum
+        self.gap_min = optional(min, self.gap_min, other.gap_min)
+        self.gap_max = optional(max, self.gap_max, other.gap_max)
+
+    def to_dict(self):
+        """
+        :return: dictionary with count, first, last, gap statistics (seconds) and events per hour
+        """
+        return {"count": self.count, "first": format_seconds(self.first), "last": format_seconds(self.last),
+                "gap_min": self.gap_min, "gap_avg": self.gap_sum / self.gaps if self.gaps > 0 else None, "gap_max": self.gap_max,
+                "hours": dict(sorted(self.hours.items()))}
+
+
+def optional(function, first, second):
+    """
+    Apply min or max to two values, which may be None
+    :param function: min or max
+    :return: result, the other value if one is None
+    """
+    if first is None or second is None:
+        return second if first is None else first
+    return function(first, second)
+
+
+def format_seconds(seconds):
+    """
+    :param seconds: time as returned by LogAnalyzer.timestamp
+    :return str: time like 2021-03-15 12:00:00, empty if None
+    """
+    if seconds is None:
+        return ""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+
+
+class LogAnalyzer:
+    """
+    Class aggregating syslog lines in a single streaming pass: events per message group and per message code, each with
+    counts, events per hour and time between events. Lines are not kept, so logs of any size (and of many routers) can be analyzed.
+    """
+
+    def __init__(self):
+        self.lines = 0
+        self.unclassified = 0  # lines without message code
+        self.groups = {}  # message group -> EventStatistics
+        self.codes = {}  # message code (e.g. R013) -> EventStatistics
+        self.flagged = set()  # codes which are flagged red
+        self.days = {}  # date string -> unix time of midnight, parsing the date once per day
+        self.last_timestamp = (None, (None, ""))  # last converted timestamp, entries of the same second share it
+
+    def timestamp(self, text: str):
+        """
+        Convert the timestamp of a log line
+        :param text: timestamp part of the line
+        :return: tuple (seconds as unix time of the routers local time, hour bucket YYYY-MM-DD HH) or (None, "") if not readable
+        """
+        if text == self.last_timestamp[0]:
+            return self.last_timestamp[1]
+        result = None, ""
+        for pattern, order in TIMESTAMP_PATTERNS:
+            match = pattern.search(text)
+            if match is not None:
+                fields = match.groups()
+                day = f"{fields[order[0]]}-{fields[order[1]]}-{fields[order[2]]}"
+                midnight = self.days.get(day)
+                if midnight is None:
+                    import calendar  # only needed once per day of the log, not on startup
+
+                    midnight = self.days[day] = calendar.timegm((int(fields[order[0]]), int(fields[order[1]]), int(fields[order[2]]), 0, 0, 0))
+                result = midnight + int(fields[3]) * 3600 + int(fields[4]) * 60 + int(fields[5]), f"{day} {fields[3]}"
+                break
+        self.last_timestamp = (text, result)
+        return result
+
+    def add(self, line: str):
+        """
+        Add a log line
+        :param line: raw log line
+        """
+        self.lines += 1
+        match = logparser.LINE_PATTERN.match(line)
+        if match is None:
+            self.unclassified += 1
+            return
+
+        prefix, number = match.group("prefix", "number")
+        group, color, red_codes = logparser.MESSAGE_TYPES.get(prefix, logparser.UNCLASSIFIED)
+        code = prefix + number
+        seconds, hour = self.timestamp(match.group("timestamp"))
+
+        statistics = self.codes.get(code)
+        if statistics is None:
+            statistics = self.codes[code] = EventStatistics()
+            if number in red_codes:
+                self.flagged.add(code)
+        statistics.add(seconds, hour)
+
+        statistics = self.groups.get(group)
+        if statistics is None:
+            statistics = self.groups[group] = EventStatistics()
+        statistics.add(seconds, hour)
+
+    def update(self, lines):
+        """
+        Add multiple log lines
+        :param lines: iterable of raw log lines, e.g. an open file
+        :return: the analyzer
+        """
+        for line in lines:
+            self.add(line)
+        self.end_log()
+        return self
+
+    def end_log(self):
+        """
+        Mark the end of a log, the next line doesn't continue the time between events (e.g. the log of another router)
+        """
+        for statistics in list(self.codes.values()) + list(self.groups.values()):
+            statistics.previous = None
+
+    def merge(self, other):
+        """
+        Add the results of another analyzer, e.g. of a log analyzed in another process
+        :param other: LogAnalyzer
+        :return: the analyzer
+        """
+        self.lines += other.lines
+        self.unclassified += other.unclassified
+        self.flagged |= other.flagged
+        for own, others in ((self.codes, other.codes), (self.groups, other.groups)):
+            for key, statistics in others.items():
+                if key in own:
+                    own[key].merge(statistics)
+                else:
+                    own[key] = statistics
+        return self
+
+    def to_dict(self):
+        """
+        :return: dictionary with the line counts and the statistics per group and per code
+        """
+        return {"lines": self.lines, "unclassified": self.unclassified,
+                "groups": {group: statistics.to_dict() for group, statistics in sorted(self.groups.items())},
+                "codes": {code: dict(statistics.to_dict(), flagged=code in self.flagged) for code, statistics in sorted(self.codes.items())}}
+
+
+def read_log_lines(path: str):
+    """
+    Read the lines of a saved log: raw text (colors are removed), ndjson written with -o ndjson or the local log cache
+    :param path: file path
+    :return: generator yielding raw log lines
+    """
+    with open(path, encoding="utf-8", errors="replace") as file:
+        for row in file:
+            if row.startswith("{"):
+                try:
+                    row = json.loads(row).get("line", "")
+                except ValueError:
+                    pass
+            elif "\x1b" in row:
+                row = COLOR_PATTERN.sub("", row)
+            row = row.strip()
+            if row != "":
+                yield row
+
+
+def analyze_file(path: str):
+    """
+    :param path: path of a saved log
+    :return: LogAnalyzer with the lines of the file
+    """
+    return LogAnalyzer().update(read_log_lines(path))
+
+
+def analyze_files(paths, workers: int = 1):
+    """
+    Analyze saved logs, e.g. of many routers
+    :param paths: list of file paths
+    :param workers: number of processes, files are analyzed in parallel if greater than 1
+    :return: LogAnalyzer with the merged results
+    """
+    analyzer = LogAnalyzer()
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            analyzer.update(read_log_lines(path))
+        return analyzer
+
+    import concurrent.futures
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        for result in executor.map(analyze_file, paths):
+            analyzer.merge(result)
+    return analyzer
@@ -0,0 +1,89 @@
+import re
+
+from .colors import BashColors
+
+'''
+possible message groups:
+e: E-Mail Notifications,
+wui: Logins and session timeouts in web interface,
+t: time messages
+v: Voice (telephony)
+dd: Dynamic DNS
+l: LTE and SIM Card
+d: DSL and configurator service
+i: IGMP
+w: WiFi
+vpn: VPN
+dh: DHCP
+u: unclassified
+'''
+MESSAGE_GROUPS = ["e", "wui", "t", "v", "dd", "l", "d", "i", "w", "vpn", "dh", "u"]
+
+# color for flagged messages (errors)
+COLOR_RED = BashColors.Background.red + BashColors.black
+
+# message code prefix -> (message group, line color, codes which are flagged red)
+MESSAGE_TYPES = {
+    "W": ("w", BashColors.Background.cyan, {"005"}),  # WiFi, 005=failed wifi device auth
+    "IG": ("i", BashColors.Background.dark_grey, set()),  # IGMP
+    "VPN": ("vpn", BashColors.Background.light_grey + BashColors.black, set()),  # VPN
+    "R": ("d", BashColors.Background.magenta + BashColors.black, {"004", "009", "013", "020"}),  # DSL Line, 004=no prefix, 020=pppoe timeout, 013=lost sync
+    "A": ("d", BashColors.Background.magenta + BashColors.black, {"004", "009", "013", "020"}),  # configuration service
+    "P": ("d", BashColors.Background.magenta + BashColors.black, {"004", "009", "013", "020"}),
+    "HA": ("l", BashColors.Background.light_magenta + BashColors.black, {"001", "002", "210", "213"}),  # LTE, SIM Card, 002=hybrid server not reachable via dsl,
+    "HYB": ("l", BashColors.Background.light_magenta + BashColors.black, {"001", "002", "210", "213"}),  # 213(no error)=time for lte ipv6 renewal, 001=sim not available
+    "LT": ("l", BashColors.Background.light_magenta + BashColors.black, {"001", "002", "210", "213"}),
+    "SI": ("l", BashColors.Background.light_magenta + BashColors.black, {"001", "002", "210", "213"}),
+    "D": ("dd", BashColors.Background.light_green + BashColors.black, {"001"}),  # dynamic dns
+    "V": ("v", BashColors.Background.blue, {"006"}),  # voice
+    "T": ("t", BashColors.Background.green + BashColors.black, {"000", "102"}),  # time, 102=time sync failed, 000=time not available
+    "NT": ("t", BashColors.Background.green + BashColors.black, {"000", "102"}),
+    "EP": ("e", BashColors.Background.yellow + BashColors.black, set()),  # email notifications
+    "G": ("wui", BashColors.Background.light_yellow + BashColors.black, set()),  # web interface sessions
+    "DH": ("dh", BashColors.Background.light_cyan + BashColors.black, set()),  # dhcp
+}
+UNCLASSIFIED = ("u", BashColors.Background.white + BashColors.black, set())  # default line color (white bg + black text)
+
+# timestamp, message code (e.g. W005 -> prefix W, number 005) and text of a log line
+LINE_PATTERN = re.compile(r"^(?P<timestamp>.*?)\s*\((?P<prefix>[A-Za-z]+)(?P<number>\d+)\)\s*(?P<text>.*)$")
+
+
+def parse_line(line: str):
+    """
+    Split a log line into its parts
+    :param line: raw log line
+    :return: tuple (timestamp, code prefix, code number, text) or None, if the line has no message code
+    """
+    match = LINE_PATTERN.match(line)
+    if match is None:
+        return None
+    return match.group("timestamp", "prefix", "number", "text")
+
+
+def classify_line(line: str):
+    """
+    Determine message group and color of a log line
+    :param line: raw log line
+    :return: tuple (message group, color start code, True if the message is flagged red)
+    """
+    match = LINE_PATTERN.match(line)
+    if match is None:
+        return UNCLASSIFIED[0], UNCLASSIFIED[1], False
+
+    group, color, red_codes = MESSAGE_TYPES.get(match.group("prefix"), UNCLASSIFIED)
+    if match.group("number") in red_codes:
+        return group, COLOR_RED, True
+    return group, color, False
+
+
+def excluded_groups(exclude_string: str, include: bool):
+    """
+    Get the message groups which should not be shown
+    :param exclude_string: comma separated message groups, which should be excluded or -if include==True - should be included
+    :param include: determines whether to include or exclude the given message groups
+    :return: set of excluded message groups
+    """
+    groups = set(exclude_string.split(","))
+    if include:  # exclude all other groups
+        return set(MESSAGE_GROUPS) - groups
+    return groups
@@ -0,0 +1,169 @@
+import collections
+import hashlib
+import json
+import os
+import re
+
+from . import logparser
+
+
+def default_cache_directory():
+    """
+    Get the default directory for local caches
+    :return: path, e.g. ~/.cache/speedport_pro_cli
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "speedport_pro_cli")
+
+
+class LogEntry:
+    """
+    Class representing a classified syslog entry
+    """
+    __slots__ = ("line", "group", "color")
+
+    def __init__(self, line: str, group: str, color: str):
+        self.line: str = line  # raw log line
+        self.group: str = group  # message group, as used for -lf
+        self.color: str = color  # color start code
+
+    def to_dict(self):
+        """
+        Get the entry as dictionary, e.g. for json output
+        :return: dictionary with timestamp, code, group, text and the raw line
+        """
+        parts = logparser.parse_line(self.line)
+        if parts is None:
+            return {"timestamp": "", "code": "", "group": self.group, "text": self.line, "line": self.line}
+        return {"timestamp": parts[0], "code": parts[1] + parts[2], "group": self.group, "text": parts[3], "line": self.line}
+
+
+def classify_lines(lines):
+    """
+    Classify multiple log lines
+    :param lines: list of raw log lines
+    :return: list of LogEntry, in the same order
+    """
+    entries = []
+    for line in lines:
+        group, color_start, flagged = logparser.classify_line(line)
+        entries.append(LogEntry(line, group, color_start))
+    return entries
+
+
+def select_entries(lines, entry_count: int = -1, excluded_groups=()):
+    """
+    Classify the newest log lines
+    :param lines: list of raw log lines, newest entry first (as sent by the speedport)
+    :param entry_count: number of lines to classify, -1 for all
+    :param excluded_groups: message groups which are left out
+    :return: list of LogEntry, oldest entry first
+    """
+    if entry_count == -1 or entry_count > len(lines):
+        entry_count = len(lines)
+
+    # classify messages, oldest of the selected entries first
+    return [entry for entry in classify_lines(lines[entry_count - 1::-1] if entry_count > 0 else []) if entry.group not in excluded_groups]
+
+
+class LogStore:
+    """
+    Class managing the local syslog cache of a router.
+    Classified entries are appended to an ndjson file (oldest entry first), a cursor file remembers the newest stored entry
+    by timestamp and hash, so only entries newer than the cursor have to be classified and stored on the next poll.
+    """
+
+    def __init__(self, directory: str, router: str):
+        """
+        :param directory: cache directory, created with the first append
+        :param router: router address, used to name the cache files
+        """
+        self.directory = directory
+        name = re.sub(r"[^\w.-]", "_", router)
+        self.entries_path = os.path.join(directory, f"{name}.log.ndjson")
+        self.cursor_path = os.path.join(directory, f"{name}.cursor.json")
+
+        self.cursor = None  # {"timestamp": ..., "hash": ...} of the newest stored entry
+        try:
+            with open(self.cursor_path) as file:
+                self.cursor = json.load(file)
+        except (OSError, ValueError):
+            pass
+        self.write_error = None  # OSError of the last failed append, None if the store is writable
+
+    @staticmethod
+    def line_hash(line: str):
+        """
+        Hash identifying a log line
+        :param line: raw log line
+        :return: hex digest
+        """
+        return hashlib.sha1(line.encode()).hexdigest()
+
+    @staticmethod
+    def line_timestamp(line: str):
+        """
+        Timestamp of a log line
+        :param line: raw log line
+        :return: timestamp string, empty if the line has no timestamp
+        """
+        parts = logparser.parse_line(line)
+        return parts[0] if parts is not None else ""
+
+    def new_lines(self, lines):
+        """
+        Get the lines which are newer than the cursor
+        :param lines: log lines as sent by the speedport, newest entry first
+        :return: list of new lines, oldest entry first
+        """
+        new = lines
+        if self.cursor is not None:
+            for x in range(0, len(lines)):
+                if self.line_timestamp(lines[x]) == self.cursor["timestamp"] and self.line_hash(lines[x]) == self.cursor["hash"]:
+                    new = lines[:x]
+                    break
+            # if the cursor entry isn't in the log anymore (log was cleared or rotated), all lines are new
+        return new[::-1]
+
+    def append(self, entries):
+        """
+        Append classified entries to the store and move the cursor to the last one.
+        If the cache directory isn't writable, the cursor is only moved in memory and the error is kept in write_error.
+        :param entries: list of LogEntry, oldest entry first
+        :return: True if the entries were stored
+        """
+        if len(entries) == 0:
+            return True
+
+        self.cursor = {"timestamp": self.line_timestamp(entries[-1].line), "hash": self.line_hash(entries[-1].line)}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.entries_path, "a") as file:
+                for entry in entries:
+                    file.write(json.dumps({"line": entry.line, "group": entry.group, "color": entry.color}) + "\n")
+
+            # write cursor to temporary file first, so an interrupted write can't corrupt it
+            with open(self.cursor_path + ".tmp", "w") as file:
+                json.dump(self.cursor, file)
+            os.replace(self.cursor_path + ".tmp", self.cursor_path)
+        except OSError as e:  # e.g. no writable home directory (cron, service users)
+            self.write_error = e
+            return False
+        self.write_error = None
+        return True
+
+    def read(self, entry_count: int = -1):
+        """
+        Read stored entries, without contacting the router
+        :param entry_count: number of newest entries to return, -1 for all
+        :return: list of LogEntry, oldest entry first
+        """
+        entries = collections.deque(maxlen=None if entry_count == -1 else entry_count)
+        try:
+            with open(self.entries_path) as file:
+                for row in file:
+                    data = json.loads(row)
+                    entries.append(LogEntry(data["line"], data["group"], data["color"]))
+        except OSError:  # nothing stored yet or not readable
+            pass
+        return list(entries)
@@ -0,0 +1,40 @@
+import csv
+import json
+import sys
+
+FORMATS = ["text", "json", "ndjson", "csv"]
+
+
+class RecordWriter:
+    """
+    Class writing structured records (dictionaries) as json, ndjson (one json object per line) or csv.
+    Records are written as they come, so the output can be consumed while the program is still running (e.g. in dynamic mode).
+    """
+
+    def __init__(self, output_format: str, stream=sys.stdout):
+        """
+        :param output_format: json, ndjson or csv
+        :param stream: file like object to write to
+        """
+        self.format = output_format
+        self.stream = stream
+        self.csv_writer = None  # created with the fields of the first record, the header is only written once
+
+    def write(self, records):
+        """
+        Write a batch of records
+        :param records: list of dictionaries
+        """
+        if self.format == "json":
+            json.dump(records, self.stream, indent=2)
+            self.stream.write("\n")
+        elif self.format == "ndjson":
+            for record in records:
+                self.stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+        elif self.format == "csv":
+            for record in records:
+                if self.csv_writer is None:
+                    self.csv_writer = csv.DictWriter(self.stream, fieldnames=list(record.keys()), extrasaction="ignore")
+                    self.csv_writer.writeheader()
+                self.csv_writer.writerow(record)
+        self.stream.flush()
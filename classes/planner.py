@@ -0,0 +1,85 @@
+from .profiling import Profiler
+from .tree import ParameterTree
+
+
+class RequestPlanner:
+    """
+    Class running multiple commands together, the parameters needed by the commands are merged into as few requests as possible.
+    A command is a generator: it yields the list of parameter names it needs next, receives a ParameterTree with the values
+    and finally returns its result. Commands which need a second step (depending on the first results) yield again.
+    """
+
+    def __init__(self, request, run_concurrently=None, max_parameters: int = 64, profiler: Profiler = None):
+        """
+        :param request: callable taking a parameter list and returning an iterable of (name, value) tuples
+        :param run_concurrently: callable taking a list of callables and returning their results (in order), None runs them one after another
+        :param max_parameters: max. number of full parameter names in one request
+        :param profiler: Profiler measuring the time the commands spend processing the responses (merge)
+        """
+        self.request = request
+        self.run_concurrently = run_concurrently
+        self.max_parameters = max(1, max_parameters)
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+
+    def plan(self, parameter_lists):
+        """
+        Merge parameter lists into requests
+        :param parameter_lists: list of parameter lists
+        :return: list of parameter lists, one per request
+        """
+        names = list(dict.fromkeys(parameter for parameter_list in parameter_lists for parameter in parameter_list))  # unique, order kept
+
+        # partial paths (e.g. Device.Hosts.Host.) may return any number of values, so they get a request of their own
+        requests = [[name] for name in names if name.endswith(".")]
+        full_names = [name for name in names if not name.endswith(".")]
+        for x in range(0, len(full_names), self.max_parameters):
+            requests.append(full_names[x:x + self.max_parameters])
+        return requests
+
+    def run(self, commands):
+        """
+        Run commands until all of them returned
+        :param commands: list of generator objects
+        :return: list with the return values of the commands, in the same order
+        """
+        results = [None] * len(commands)
+        pending = {}  # command index -> (command, parameter list of its current step)
+        for index, command in enumerate(commands):
+            self.advance(index, command, None, pending, results)
+
+        while len(pending) > 0:
+            requests = self.plan([parameter_list for command, parameter_list in pending.values()])
+            functions = [lambda parameter_list=parameter_list: list(self.request(parameter_list)) for parameter_list in requests]
+            if self.run_concurrently is not None:
+                responses = self.run_concurrently(functions)
+            else:
+                responses = [function() for function in functions]
+
+            with self.profiler.span("merge"):
+                parameters = ParameterTree()
+                for response in responses:
+                    parameters.update(response)
+
+            step = pending
+            pending = {}
+            for index, (command, parameter_list) in step.items():
+                self.advance(index, command, parameters, pending, results)
+        return results
+
+    def advance(self, index, command, parameters, pending, results):
+        """
+        Run a command until it needs parameters or returns
+        :param index: command index
+        :param command: generator object
+        :param parameters: ParameterTree to send, None for the first step
+        :param pending: dictionary of waiting commands, the command is added if it needs parameters
+        :param results: list of results, the return value is stored if the command finished
+        """
+        try:
+            with self.profiler.span("merge"):
+                parameter_list = command.send(parameters)
+                while len(parameter_list) == 0:  # nothing to request, continue right away
+                    parameter_list = command.send(ParameterTree())
+            pending[index] = (command, parameter_list)
+        except StopIteration as e:
+            results[index] = e.value
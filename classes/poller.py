@@ -0,0 +1,99 @@
+import sys
+
+
+class ClientChanges:
+    """
+    Class holding the changes of the client list between two polls
+    """
+    __slots__ = ("joined", "left", "changed")
+
+    def __init__(self):
+        self.joined: list = []  # clients which weren't associated in the last poll
+        self.left: list = []  # clients of the last poll, which aren't associated anymore
+        self.changed: list = []  # clients with changed signal strength or rates
+
+    def __len__(self):
+        return len(self.joined) + len(self.left) + len(self.changed)
+
+
+class ClientPoller:
+    """
+    Class polling the clients of a WiFi interface (or a list of interfaces), the previous snapshot is kept to compute the changes between polls.
+    The interface information itself (ssid, channel, ...) rarely changes, so it is only refreshed every metadata_interval polls.
+    """
+
+    def __init__(self, fetch_interface, fetch_clients, metadata_interval: int = 10, interface=None):
+        """
+        :param fetch_interface: callable without arguments, returning the current interface object or list of interfaces
+        :param fetch_clients: callable taking the interface(s) and returning them with completed client lists
+        :param metadata_interval: number of polls after which the interface information is refreshed
+        :param interface: already known interface object, saves the first metadata request
+        """
+        self.fetch_interface = fetch_interface
+        self.fetch_clients = fetch_clients
+        self.metadata_interval = max(1, metadata_interval)
+        self.interface = interface
+        self.polls = 0
+        self.previous = {}  # mac address -> client of the last poll
+
+    def poll(self):
+        """
+        Get the current clients and compare them to the last poll
+        :return: tuple (interface(s) with completed client list, ClientChanges)
+        """
+        if self.interface is None or (self.polls > 0 and self.polls % self.metadata_interval == 0):
+            self.interface = self.fetch_interface()
+        interface = self.fetch_clients(self.interface)
+        self.polls += 1
+
+        changes = ClientChanges()
+        current = {}
+        interfaces = interface if isinstance(interface, list) else [interface]
+        for client in [client for entry in interfaces for client in entry.clients]:
+            current[client.mac_address] = client
+            previous = self.previous.get(client.mac_address)
+            if previous is None:
+                changes.joined.append(client)
+            elif (previous.signal_strength, previous.downstream_speed, previous.upstream_speed, previous.active) != \
+                    (client.signal_strength, client.downstream_speed, client.upstream_speed, client.active):
+                changes.changed.append(client)
+
+        for mac_address, client in self.previous.items():
+            if mac_address not in current:
+                changes.left.append(client)
+
+        self.previous = current
+        return interface, changes
+
+
+class ScreenRenderer:
+    """
+    Class drawing output in place in the terminal, only lines which changed since the last frame are rewritten (ANSI cursor control).
+    This avoids clearing the whole screen (and the flicker caused by it) on every refresh.
+    """
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.lines = None  # lines of the last frame, None before the first frame
+
+    def render(self, lines):
+        """
+        Draw a frame
+        :param lines: list of lines to display
+        """
+        output = []
+        if self.lines is None:  # clear screen once, for the first frame
+            output.append("\33[H\33[2J")
+            self.lines = []
+
+        for row, line in enumerate(lines):
+            if row >= len(self.lines) or self.lines[row] != line:
+                output.append(f"\33[{row + 1};1H\33[0m{line}\33[K")  # move to row, reset colors, write line, clear rest of the row
+
+        if len(lines) < len(self.lines):  # frame got shorter, clear remaining rows
+            output.append(f"\33[{len(lines) + 1};1H\33[J")
+
+        output.append(f"\33[0m\33[{len(lines) + 1};1H")  # park cursor below the frame
+        self.stream.write("".join(output))
+        self.stream.flush()
+        self.lines = list(lines)
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+
+
+class Span:
+    """
+    Class measuring a single phase (e.g. send, parse), used as context manager.
+    Spans opened while another span of the same thread is open are its children, their time is not counted as self time of the parent.
+    """
+    __slots__ = ("profiler", "name", "start", "children")
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name: str = name  # may be changed before the span ends, e.g. if a request turned out to be an authentication challenge
+        self.start: float = 0
+        self.children: float = 0  # seconds spent in child spans
+
+    def __enter__(self):
+        self.profiler.stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        stack = self.profiler.stack()
+        stack.pop()
+        if len(stack) > 0:
+            stack[-1].children += duration
+        self.profiler.record(self.name, duration, duration - self.children)
+        return False
+
+
+class _DisabledSpan:
+    """
+    Span of a disabled profiler, does nothing
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, key, value):  # renaming a disabled span is ignored
+        pass
+
+
+DISABLED_SPAN = _DisabledSpan()
+
+
+class Profiler:
+    """
+    Class collecting the time spent in the phases of requests (connect, auth, send, receive, parse) and of the commands (merge, render).
+    Thread safe, spans of concurrent requests are collected in the same profiler. A disabled profiler costs a single attribute check per span.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        :param enabled: collect measurements, if False all spans are no-ops
+        """
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.local = threading.local()  # stack of open spans per thread
+        self.stats = {}  # span name -> [calls, total seconds, self seconds, max. seconds]
+        self.hooks = []  # callables taking (span name, seconds), called when a span ends
+        self.start = time.perf_counter()
+
+    def stack(self):
+        """
+        :return: list of open spans of the current thread
+        """
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def span(self, name: str):
+        """
+        Measure a phase
+        :param name: phase name, measurements with the same name are summed up
+        :return: context manager
+        """
+        if not self.enabled:
+            return DISABLED_SPAN
+        return Span(self, name)
+
+    def iterate(self, name: str, iterable):
+        """
+        Measure the time spent producing the items of an iterable (e.g. receiving chunks or parsing), but not the time the consumer spends
+        :param name: phase name
+        :param iterable: iterable to measure
+        :return: generator yielding the items of the iterable
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+
+        iterator = iter(iterable)
+        while True:
+            with self.span(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def record(self, name: str, seconds: float, self_seconds: float = None):
+        """
+        Add a measurement, e.g. taken by another program
+        :param name: phase name
+        :param seconds: duration
+        :param self_seconds: duration without child phases, defaults to seconds
+        """
+        if self_seconds is None:
+            self_seconds = seconds
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = [0, 0.0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += self_seconds
+            stats[3] = max(stats[3], seconds)
+        for hook in self.hooks:
+            hook(name, seconds)
+
+    def add_hook(self, hook):
+        """
+        Forward measurements, e.g. to an exporter or the logging of an embedding program
+        :param hook: callable taking (span name, seconds), called for every ended span (from the thread which measured it)
+        """
+        self.hooks.append(hook)
+
+    def reset(self):
+        """
+        Remove all measurements
+        """
+        with self.lock:
+            self.stats = {}
+            self.start = time.perf_counter()
+
+    def report(self):
+        """
+        Get the measurements, phases with the highest self time first
+        :return: list of dictionaries with name, calls, total_ms, self_ms and max_ms
+        """
+        with self.lock:
+            stats = [(name, list(values)) for name, values in self.stats.items()]
+        stats.sort(key=lambda entry: entry[1][2], reverse=True)
+        return [{"name": name, "calls": calls, "total_ms": total * 1000, "self_ms": self_time * 1000, "max_ms": maximum * 1000}
+                for name, (calls, total, self_time, maximum) in stats]
+
+    def format_report(self, report_format: str = "table"):
+        """
+        Format the measurements
+        :param report_format: table or json
+        :return str: formatted report
+        """
+        wall_time = (time.perf_counter() - self.start) * 1000
+        if report_format == "json":
+            return json.dumps({"wall_ms": wall_time, "spans": self.report()})
+
+        lines = [f"{'phase':<10} {'calls':>7} {'total (ms)':>11} {'self (ms)':>10} {'max (ms)':>9}"]
+        for entry in self.report():
+            lines.append(f"{entry['name']:<10} {entry['calls']:>7} {entry['total_ms']:>11.2f} {entry['self_ms']:>10.2f} {entry['max_ms']:>9.2f}")
+        lines.append(f"wall time: {wall_time:.2f} ms (phases of concurrent requests overlap)")
+        return "\n".join(lines)
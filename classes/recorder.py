@@ -0,0 +1,191 @@
+import math
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+# column name -> array type code, one file per column, all columns have the same number of rows (fixed width samples)
+COLUMNS = {
+    "timestamp": "d",  # unix time of the poll, ascending
+    "mac": "Q",  # mac address as 48 bit integer
+    "interface": "H",
+    "signal_strength": "h",
+    "downstream_speed": "q",
+    "upstream_speed": "q",
+}
+
+
+def mac_to_int(mac_address: str):
+    """
+    :param mac_address: mac address like aa:bb:cc:dd:ee:ff
+    :return int: mac address as integer, 0 if invalid
+    """
+    try:
+        return int(mac_address.replace(":", "").replace("-", ""), 16) & 0xFFFFFFFFFFFF
+    except ValueError:
+        return 0
+
+
+def int_to_mac(value: int):
+    """
+    :param value: mac address as integer
+    :return str: mac address like aa:bb:cc:dd:ee:ff
+    """
+    return ":".join(f"{value >> shift & 255:02x}" for shift in range(40, -1, -8))
+
+
+def parse_window(window: str):
+    """
+    Parse a time window given on the command line
+    :param window: seconds with optional unit, e.g. 90, 30m, 12h or 7d
+    :return float: seconds
+    """
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd]?)", window.strip())
+    if match is None:
+        raise ValueError(f"invalid time window {window}")
+    return float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+
+
+def percentile(sorted_values, percent: float):
+    """
+    Nearest rank percentile
+    :param sorted_values: ascending values, not empty
+    :param percent: 0 - 100
+    :return: value
+    """
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(percent * len(sorted_values) / 100) - 1))
+    return sorted_values[rank]
+
+
+class ClientRecorder:
+    """
+    Class storing the client samples of every poll (signal strength and rates per mac address) of a router on disk.
+    Each field is stored in its own file as native binary array, so a sample takes 36 bytes, appending is a single write per column
+    and a time window is found by binary search on the memory mapped timestamp column and read in one piece per column.
+    Reading doesn't change the files, another process may be recording at the same time; only the recorder repairs them before its first append.
+    """
+
+    def __init__(self, directory: str, router: str):
+        """
+        :param directory: cache directory, created with the first append
+        :param router: router address, used to name the directory of the column files
+        """
+        self.directory = os.path.join(directory, re.sub(r"[^\w.-]", "_", router) + ".clients")
+        self.paths = {column: os.path.join(self.directory, f"{column}.{type_code}") for column, type_code in COLUMNS.items()}
+        self.repaired = False  # columns were cut to the same length by this recorder
+
+    def __len__(self):
+        """
+        :return: number of complete samples, a sample being appended by another process isn't counted yet
+        """
+        return min(self.rows(column) for column in COLUMNS)
+
+    def rows(self, column: str):
+        """
+        :param column: column name
+        :return: number of complete values in the columns file
+        """
+        try:
+            return os.path.getsize(self.paths[column]) // array(COLUMNS[column]).itemsize
+        except OSError:
+            return 0
+
+    def repair(self):
+        """
+        Cut all columns to the same number of rows, e.g. after the program was killed while appending
+        """
+        rows = min(self.rows(column) for column in COLUMNS)
+        for column, type_code in COLUMNS.items():
+            size = rows * array(type_code).itemsize
+            if os.path.exists(self.paths[column]) and os.path.getsize(self.paths[column]) != size:
+                with open(self.paths[column], "r+b") as file:
+                    file.truncate(size)
+
+    def append(self, table, timestamp: float):
+        """
+        Store the clients of a poll
+        :param table: wifi.ClientTable with the clients of the poll
+        :param timestamp: unix time of the poll, should not be older than the last stored one
+        """
+        if len(table) == 0:
+            return
+        if not self.repaired:  # samples of a killed recorder, only the writing process may cut them
+            os.makedirs(self.directory, exist_ok=True)
+            self.repair()
+            self.repaired = True
+
+        columns = {
+            "timestamp": array("d", [timestamp]) * len(table),
+            "mac": array("Q", [mac_to_int(mac_address) for mac_address in table.mac_addresses]),
+            "interface": table.interface_ids,
+            "signal_strength": table.signal_strengths,
+            "downstream_speed": table.downstream_speeds,
+            "upstream_speed": table.upstream_speeds,
+        }
+        # timestamp column is written last, a sample only counts once it is complete
+        for column in list(COLUMNS)[1:] + ["timestamp"]:
+            with open(self.paths[column], "ab") as file:
+                columns[column].tofile(file)
+
+    def window(self, start: float, end: float):
+        """
+        Find the samples of a time window
+        :param start: unix time, inclusive
+        :param end: unix time, inclusive
+        :return: tuple (first row, row after the last one)
+        """
+        rows = len(self)
+        if rows == 0:
+            return 0, 0
+
+        with open(self.paths["timestamp"], "rb") as file, mmap.mmap(file.fileno(), rows * 8, access=mmap.ACCESS_READ) as mapped:
+            timestamps = memoryview(mapped).cast("d")
+            try:
+                return bisect_left(timestamps, start), bisect_right(timestamps, end)
+            finally:
+                timestamps.release()
+
+    def read(self, start: float, end: float):
+        """
+        Read all columns of a time window
+        :param start: unix time, inclusive
+        :param end: unix time, inclusive
+        :return: dictionary column name -> array with the values of the window
+        """
+        first, last = self.window(start, end)
+        columns = {}
+        for column, type_code in COLUMNS.items():
+            values = array(type_code)
+            if last > first:
+                with open(self.paths[column], "rb") as file:
+                    file.seek(first * values.itemsize)
+                    values.fromfile(file, last - first)
+            columns[column] = values
+        return columns
+
+    def query(self, start: float, end: float):
+        """
+        Compute per client statistics for a time window
+        :param start: unix time, inclusive
+        :param end: unix time, inclusive
+        :return: list of dictionaries (one per mac address, sorted by mac) with sample count, last interface and
+                 min/avg/p5/p50/p95/max of signal strength, downstream and upstream rate
+        """
+        columns = self.read(start, end)
+
+        # row numbers per mac address
+        clients = {}
+        for row, mac in enumerate(columns["mac"]):
+            clients.setdefault(mac, array("L")).append(row)
+
+        results = []
+        for mac, rows in sorted(clients.items()):
+            result = {"mac_address": int_to_mac(mac), "interface": columns["interface"][rows[-1]], "samples": len(rows),
+                      "first_seen": columns["timestamp"][rows[0]], "last_seen": columns["timestamp"][rows[-1]]}
+            for column in ("signal_strength", "downstream_speed", "upstream_speed"):
+                values = sorted(columns[column][row] for row in rows)
+                result[column] = {"min": values[0], "avg": sum(values) / len(values), "p5": percentile(values, 5), "p50": percentile(values, 50),
+                                  "p95": percentile(values, 95), "max": values[-1]}
+            results.append(result)
+        return results
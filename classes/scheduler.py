@@ -0,0 +1,168 @@
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request, while the circuit breaker of a router is open (the router failed repeatedly)
+    """
+    pass
+
+
+class TokenBucket:
+    """
+    Class limiting the request rate to a router: each request takes a token, tokens are refilled at a fixed rate up to the burst size.
+    Thread safe, callers wait until a token is available.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: tokens (requests) per second
+        :param burst: max. number of tokens, requests which can be sent at once after a pause
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, wait if none is available
+        :return float: seconds waited
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class CircuitBreaker:
+    """
+    Class stopping requests to a router after repeated failures, so an unreachable or overloaded router isn't flooded with retries.
+    After reset_timeout seconds a single trial request is let through (half open), its result closes or opens the circuit again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        """
+        :param failure_threshold: number of consecutive failures opening the circuit
+        :param reset_timeout: seconds the circuit stays open before a trial request is allowed
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0  # consecutive failures
+        self.opened = None  # time.monotonic() when the circuit was opened, None while closed
+        self.trial = False  # a trial request of the half open circuit is running
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        :return str: closed, open or half-open
+        """
+        with self.lock:
+            if self.opened is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.opened >= self.reset_timeout else "open"
+
+    def allow(self):
+        """
+        Check whether a request may be sent, raise CircuitOpenError if not
+        """
+        with self.lock:
+            if self.opened is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self.opened)
+            if remaining > 0 or self.trial:
+                raise CircuitOpenError(f"Router failed {self.failures} times in a row, next attempt in {max(0.0, remaining):.0f} seconds.")
+            self.trial = True
+
+    def record_success(self):
+        """
+        Close the circuit, the router answered
+        """
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+            self.trial = False
+
+    def record_failure(self):
+        """
+        Count a failed request, opens the circuit after too many failures in a row or if the trial request failed
+        """
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.failure_threshold:
+                self.opened = time.monotonic()
+            self.trial = False
+
+
+class RequestScheduler:
+    """
+    Class sending the requests to a router: waits for the rate limit, checks the circuit breaker and retries transient failures
+    (timeouts, connection errors, overloaded router) with exponential backoff and jitter. Only idempotent requests may be scheduled.
+    """
+
+    def __init__(self, retries: int = 2, backoff: float = 0.25, max_backoff: float = 4, rate_limit: TokenBucket = None, breaker: CircuitBreaker = None,
+                 is_transient=None, deadline: float = None):
+        """
+        :param retries: max. number of repetitions of a failed request, the number of attempts is retries + 1
+        :param backoff: seconds to wait before the first repetition, doubled for every further one
+        :param max_backoff: max. seconds to wait between two attempts
+        :param rate_limit: TokenBucket limiting the attempts, None for no limit
+        :param breaker: CircuitBreaker of the router, None to always send requests
+        :param is_transient: callable taking an exception and returning whether a repetition could succeed, None treats all errors as permanent
+        :param deadline: time.monotonic() value after which no repetition is started, e.g. the time limit of a fleet router; None for no limit
+        """
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limit = rate_limit
+        self.breaker = breaker
+        self.is_transient = is_transient if is_transient is not None else (lambda error: False)
+        self.deadline = deadline
+
+    def call(self, function):
+        """
+        Run a request
+        :param function: callable without arguments sending the request, raising an exception if it failed
+        :return: return value of the function
+        """
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.allow()
+            if self.rate_limit is not None:
+                self.rate_limit.acquire()
+
+            try:
+                result = function()
+            except Exception as e:
+                transient = self.is_transient(e)
+                if self.breaker is not None:
+                    if transient:
+                        self.breaker.record_failure()
+                    else:  # the router answered, e.g. with a fault for an invalid parameter
+                        self.breaker.record_success()
+                if not transient or attempt >= self.retries:
+                    raise
+                import random  # only needed for retries
+
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1)  # jitter spreads retries of concurrent requests
+                if self.deadline is not None and time.monotonic() + delay >= self.deadline:
+                    raise  # no time left for another attempt
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if self.breaker is not None:
+                self.breaker.record_success()
+            return result
@@ -0,0 +1,323 @@
+import hashlib
+import re
+import threading
+
+from .profiling import Profiler
+
+
+class AuthenticationError(Exception):
+    """
+    Raised if the speedport requests authentication, but no password is available
+    """
+    pass
+
+
+class SoapFault(Exception):
+    """
+    Raised if the speedport answers with a SOAP fault, e.g. 9005 for an invalid parameter name
+    """
+
+    def __init__(self, code: int, description: str, status: int = 500):
+        """
+        :param code: cwmp fault code, 0 if the response didn't contain one
+        :param description: fault string
+        :param status: http status code of the response
+        """
+        super().__init__(f"Router returned fault {code}: {description}")
+        self.code = code
+        self.description = description
+        self.status = status
+
+
+# http status codes and cwmp fault codes (internal error, resources exceeded) of an overloaded router, worth repeating the request
+TRANSIENT_STATUS_CODES = (429, 502, 503, 504)
+TRANSIENT_FAULT_CODES = (9002, 9004)
+INVALID_PARAMETER_NAME = 9005  # fault code for a parameter which doesn't exist, e.g. a removed table entry
+
+
+def is_transient(error: Exception):
+    """
+    Check whether a failed request could succeed if it is repeated
+    :param error: exception raised by SoapSession.post
+    :return bool: True for timeouts, connection errors and errors of an overloaded router
+    """
+    import requests
+
+    if isinstance(error, SoapFault):
+        return error.code in TRANSIENT_FAULT_CODES or error.status in TRANSIENT_STATUS_CODES
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in TRANSIENT_STATUS_CODES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def parse_fault(body: bytes, status: int = 500):
+    """
+    Get the fault of an error response
+    :param body: response body
+    :param status: http status code of the response
+    :return: SoapFault, None if the body isn't a SOAP fault
+    """
+    from xml.etree import ElementTree
+
+    try:
+        root = ElementTree.fromstring(body)
+    except ElementTree.ParseError:
+        return None
+
+    fields = {}
+    for element in root.iter():
+        fields.setdefault(element.tag.rpartition("}")[2], (element.text or "").strip())  # local name without namespace
+    if "Fault" not in fields:
+        return None
+    try:
+        code = int(fields.get("FaultCode", "0"))
+    except ValueError:
+        code = 0
+    return SoapFault(code, fields.get("FaultString") or fields.get("faultstring") or "unknown fault", status)
+
+
+def parse_challenge(header: str):
+    """
+    Parse a WWW-Authenticate header
+    :param header: header value, e.g. Digest realm="BT", nonce="abc", qop="auth,auth-int"
+    :return: dictionary with the parameters of the challenge, keys in lower case
+    """
+    fields = {}
+    for match in re.finditer(r"([\w-]+)\s*=\s*(?:\"((?:[^\"\\]|\\.)*)\"|([^\s,]*))", header.strip().partition(" ")[2]):
+        value = match.group(2) if match.group(2) is not None else match.group(3)
+        fields[match.group(1).lower()] = re.sub(r"\\(.)", r"\1", value)  # unquote escaped characters
+    return fields
+
+
+class DigestAuth:
+    """
+    Class answering digest challenges of the speedport (RFC 7616 with MD5, with or without qop=auth).
+    HA1 and HA2 are computed once per realm and uri and the hash of the constant "HA1:nonce:" prefix is kept per nonce,
+    so an authorization header costs one md5 update. With qop the nonce count is increased for every request, which lets
+    the router accept the reused nonce.
+    """
+
+    def __init__(self, username: str, password: str = None):
+        """
+        :param username: user name, dslf-config for the speedport
+        :param password: password, None if the router doesn't request authentication
+        """
+        self.username = username
+        self.password = password
+        self.realm = "BT"
+        self.nonce = None  # nonce of the last challenge, None until the first challenge
+        self.opaque = None
+        self.qop = None  # auth if the router requested it, None for the old (RFC 2069) digest
+        self.nonce_count = 0  # number of requests sent with the current nonce
+        self.hashes = {}  # (realm or method and uri) -> hex digest of HA1/HA2
+        self.prefix = None  # md5 object with the data "HA1:nonce:" of the current nonce
+        self.lock = threading.Lock()
+
+    def hash(self, value: str):
+        """
+        :param value: HA1 or HA2 input, e.g. POST:/
+        :return str: cached md5 hex digest
+        """
+        digest = self.hashes.get(value)
+        if digest is None:
+            digest = self.hashes[value] = hashlib.md5(value.encode()).hexdigest()
+        return digest
+
+    def challenge(self, header: str):
+        """
+        Store the parameters of a challenge
+        :param header: value of the WWW-Authenticate header
+        """
+        fields = parse_challenge(header)
+        with self.lock:
+            self.realm = fields.get("realm", self.realm)
+            self.nonce = fields.get("nonce")
+            self.opaque = fields.get("opaque")
+            self.qop = "auth" if "auth" in [option.strip() for option in fields.get("qop", "").split(",")] else None
+            self.nonce_count = 0
+            self.prefix = None
+
+    def authorization_header(self, method: str = "POST", uri: str = "/"):
+        """
+        Build the digest authorization header for the current nonce
+        :param method: http method
+        :param uri: request uri
+        :return: value for the Authorization header
+        """
+        if self.password is None:
+            raise AuthenticationError("Request needs authentication, but no password was set.")
+
+        with self.lock:
+            if self.prefix is None:
+                self.prefix = hashlib.md5(f"{self.hash(f'{self.username}:{self.realm}:{self.password}')}:{self.nonce}:".encode())
+            self.nonce_count += 1
+            response_hash = self.prefix.copy()
+            realm, nonce, nonce_count, qop, opaque = self.realm, self.nonce, self.nonce_count, self.qop, self.opaque
+
+        header = f"Digest username=\"{self.username}\", realm=\"{realm}\", nonce=\"{nonce}\", uri=\"{uri}\", algorithm=MD5"
+        if qop is not None:
+            import secrets  # only needed by routers requesting qop
+
+            cnonce = secrets.token_hex(8)
+            response_hash.update(f"{nonce_count:08x}:{cnonce}:{qop}:{self.hash(f'{method}:{uri}')}".encode())
+            header += f", qop={qop}, nc={nonce_count:08x}, cnonce=\"{cnonce}\""
+        else:
+            response_hash.update(self.hash(f"{method}:{uri}").encode())
+        if opaque is not None:
+            header += f", opaque=\"{opaque}\""
+        return header + f", response=\"{response_hash.hexdigest()}\""
+
+
+class SoapSession:
+    """
+    Class representing a persistent connection to the SOAP (TR-064) interface of the speedport.
+    The underlying HTTPS connection is kept alive and reused, the digest nonce is cached and sent proactively (DigestAuth),
+    so the 401 challenge round trip is only needed for the first request or if the router rejects a stale nonce.
+    requests (and urllib3) are imported when the first request is sent, commands which don't query the router start faster without them.
+    """
+
+    def __init__(self, address: str, password: str = None, headers: dict = None, port: int = 49443, pool_size: int = 4, timeout: float = None,
+                 profiler: Profiler = None):
+        self.url = f"https://{address}:{port}/"
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)  # measures connect, auth, send, receive and parse
+        self.digest = DigestAuth("dslf-config", password)
+        self.timeout = timeout  # seconds to wait for the router (or tuple of connect and read timeout), None waits forever
+        self.headers = headers
+        self.pool_size = pool_size
+        self.session = None  # requests session, created with the first request
+        self.session_lock = threading.Lock()
+
+    def connect(self):
+        """
+        Create the requests session, if it doesn't exist yet
+        :return: requests session
+        """
+        with self.session_lock:
+            if self.session is None:
+                import requests
+                import urllib3
+
+                # the speedport uses a self signed certificate, requests are sent without verification
+                urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+                session = requests.Session()
+                if self.headers is not None:
+                    session.headers.update(self.headers)
+
+                # keep-alive pool for the router, one connection per concurrent request
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                if self.profiler.enabled:  # measure tcp connect and tls handshake of new connections
+                    adapter.poolmanager.pool_classes_by_scheme = dict(adapter.poolmanager.pool_classes_by_scheme, https=profiled_pool_class(self.profiler))
+                session.mount("https://", adapter)
+                self.session = session
+            return self.session
+
+    def close(self):
+        """
+        Close the connections of the session, a new session is created with the next request
+        """
+        with self.session_lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+    def post(self, data: bytes, stream: bool = False, action: str = None):
+        """
+        Send SOAP data to the speedport, authenticate if needed
+        :param data: SOAP envelope, e.g. built by envelope.EnvelopeBuilder
+        :param stream: if True, the response body is not downloaded immediately, but can be read incrementally
+        :param action: value of the SOAPAction header, None to use the one of the session headers
+        :return: requests response object, with status 200
+        """
+        session = self.connect()
+        headers = {} if action is None else {"SOAPAction": action}
+        if self.digest.nonce is not None:  # reuse cached nonce, saves the challenge round trip
+            headers["Authorization"] = self.digest.authorization_header()
+
+        challenged = False
+        with self.profiler.span("send") as span:  # until the response headers are received
+            response = session.post(url=self.url, headers=headers, data=data, verify=False, stream=stream, timeout=self.timeout)
+
+            # if header is set, authentication is needed (first request or stale nonce); answer challenge and resend the request
+            if "WWW-Authenticate" in response.headers:
+                challenged = True
+                span.name = "auth"  # the round trip was only needed for the challenge
+                self.digest.challenge(response.headers["WWW-Authenticate"])
+
+                response.content  # read the (short) challenge body, closing a streamed response would drop the connection instead of reusing it
+                headers["Authorization"] = self.digest.authorization_header()
+
+        if challenged:
+            with self.profiler.span("send"):
+                response = session.post(url=self.url, headers=headers, data=data, verify=False, stream=stream, timeout=self.timeout)
+
+        return self.check(response)
+
+    def check(self, response):
+        """
+        Raise an exception for error responses
+        :param response: requests response object
+        :return: the response, if the request succeeded
+        """
+        if response.status_code == 200:
+            return response
+        if response.status_code == 401:
+            self.digest.nonce = None
+            response.close()
+            raise AuthenticationError("Authentication failed, check the password.")
+
+        fault = parse_fault(response.content, response.status_code)  # error responses are small, read them at once
+        if fault is not None:
+            raise fault
+        response.raise_for_status()
+        return response
+
+
+def profiled_pool_class(profiler: Profiler):
+    """
+    Get a connection pool class, which measures the connect phase (tcp connect and tls handshake) of new connections
+    :param profiler: Profiler to record the connect spans in
+    :return: subclass of urllib3s HTTPSConnectionPool
+    """
+    from urllib3.connection import HTTPSConnection
+    from urllib3.connectionpool import HTTPSConnectionPool
+
+    class ProfiledConnection(HTTPSConnection):
+        def connect(self):
+            with profiler.span("connect"):
+                return super().connect()
+
+    class ProfiledPool(HTTPSConnectionPool):
+        ConnectionCls = ProfiledConnection
+
+    return ProfiledPool
+
+
+def iter_parameter_values(chunks):
+    """
+    Incrementally parse a GetParameterValuesResponse, without building the whole document in memory
+    :param chunks: iterable of byte chunks of the response body
+    :return: generator yielding (name, value) tuples, value is an empty string if the parameter has no value
+    """
+    from xml.etree import ElementTree
+
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+    parents = []  # stack of open elements, needed to drop already parsed entries from their parent
+    name = None
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                parents.append(element)
+                continue
+
+            parents.pop()
+            tag = element.tag.rpartition("}")[2]  # local name without namespace
+            if tag == "Name":
+                name = element.text
+            elif tag == "Value":
+                yield name, element.text if element.text is not None else ""
+            elif tag == "ParameterValueStruct" and len(parents) > 0:
+                parents[-1].remove(element)  # entry is processed, free memory
+    parser.close()
@@ -0,0 +1,68 @@
+class ParameterTree:
+    """
+    Class indexing TR-064 parameters by object instance.
+    A parameter like Device.WiFi.AccessPoint.1.AssociatedDevice.2.MACAddress is stored in the table
+    Device.WiFi.AccessPoint.1.AssociatedDevice. for instance 2, with the field name MACAddress.
+    """
+
+    def __init__(self, parameters=None):
+        self.values = {}  # full parameter name -> value
+        self.tables = {}  # table path -> {instance number -> {field name -> value}}
+        if parameters is not None:
+            self.update(parameters)
+
+    def add(self, name: str, value: str):
+        """
+        Add a single parameter to the tree
+        :param name: full parameter name, e.g. Device.WiFi.SSID.1.Status
+        :param value: parameter value
+        """
+        self.values[name] = value
+
+        # the last numeric path element is the instance number, everything after it is the field name
+        parts = name.split(".")
+        for x in range(len(parts) - 2, -1, -1):
+            if parts[x].isdigit():
+                table = ".".join(parts[:x]) + "."
+                self.tables.setdefault(table, {}).setdefault(int(parts[x]), {})[".".join(parts[x + 1:])] = value
+                break
+
+    def update(self, parameters):
+        """
+        Add multiple parameters to the tree
+        :param parameters: iterable of (name, value) tuples, as returned by get_request
+        """
+        for name, value in parameters:
+            self.add(name, value)
+
+    def get(self, name: str, default: str = ""):
+        """
+        Get the value of a single parameter
+        :param name: full parameter name
+        :param default: value to return, if the parameter is unknown
+        :return: parameter value
+        """
+        return self.values.get(name, default)
+
+    def instances(self, table: str):
+        """
+        Get all instances of an object table
+        :param table: table path including the trailing dot, e.g. Device.Hosts.Host.
+        :return: dictionary instance number -> {field name -> value}
+        """
+        return self.tables.get(table, {})
+
+    def index(self, table: str, field: str):
+        """
+        Build a lookup dictionary from a field value to the instance number, e.g. MAC address -> host number.
+        If multiple instances have the same value, the one with the lowest number is used.
+        :param table: table path including the trailing dot
+        :param field: field name, whose values are used as keys
+        :return: dictionary field value -> instance number
+        """
+        index = {}
+        for instance in sorted(self.instances(table)):
+            fields = self.tables[table][instance]
+            if field in fields:
+                index.setdefault(fields[field], instance)
+        return index
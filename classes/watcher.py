@@ -0,0 +1,208 @@
+import json
+import sys
+import threading
+import time
+
+from . import logparser
+
+INTERFACE_COUNT = 7  # Device.WiFi.SSID.1 - 7
+
+
+def indicator_names():
+    """
+    :return: list of the cheap parameters which change when clients join or leave or interfaces go up or down
+    """
+    names = []
+    for x in range(1, INTERFACE_COUNT + 1):
+        names.append(f"Device.WiFi.SSID.{x}.Status")
+        names.append(f"Device.WiFi.AccessPoint.{x}.AssociatedDeviceNumberOfEntries")
+    return names
+
+
+class HookRunner:
+    """
+    Class delivering events to hooks in a background thread, so a slow hook (or webhook endpoint) doesn't delay polling.
+    Errors of hooks are printed to stderr and don't stop the watcher.
+    """
+
+    def __init__(self, hooks):
+        """
+        :param hooks: list of callables taking an event dictionary
+        """
+        import queue
+
+        self.hooks = list(hooks)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.deliver, name="hooks", daemon=True)
+        self.thread.start()
+
+    def fire(self, event: dict):
+        """
+        Queue an event for all hooks
+        :param event: event dictionary
+        """
+        if len(self.hooks) > 0:
+            self.queue.put(event)
+
+    def deliver(self):
+        while True:
+            event = self.queue.get()
+            for hook in self.hooks:
+                try:
+                    hook(event)
+                except Exception as e:
+                    print(f"[-] Hook failed for {event['event']}: {e}", file=sys.stderr)
+            self.queue.task_done()
+
+    def wait(self, timeout: float = 5):
+        """
+        Wait until queued events are delivered, e.g. before exiting
+        :param timeout: max. seconds to wait
+        """
+        end = time.monotonic() + timeout
+        while self.queue.unfinished_tasks > 0 and time.monotonic() < end:
+            time.sleep(0.05)
+
+
+def command_hook(command: str, timeout: float = 30):
+    """
+    Hook running a shell command for each event, the event is passed as json on stdin and its type in SPEEDPORT_EVENT
+    :param command: shell command
+    :param timeout: max. seconds the command may run
+    :return: hook callable
+    """
+    def hook(event):
+        import os
+        import subprocess
+
+        subprocess.run(command, shell=True, input=json.dumps(event).encode(), env=dict(os.environ, SPEEDPORT_EVENT=event["event"]), timeout=timeout, check=True)
+    return hook
+
+
+def webhook(url: str, timeout: float = 5):
+    """
+    Hook posting each event as json to a (local) http endpoint
+    :param url: endpoint, e.g. http://127.0.0.1:8080/speedport
+    :param timeout: max. seconds to wait for the endpoint
+    :return: hook callable
+    """
+    def hook(event):
+        import urllib.request
+
+        request = urllib.request.Request(url, data=json.dumps(event).encode(), headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+    return hook
+
+
+class Watcher:
+    """
+    Class watching a router for events (client joined/left, interface up/down, new log entry flagged red).
+    Only a few cheap indicator parameters (interface status, number of associated devices) are polled at a fast cadence,
+    the clients are fetched only if an indicator changed (and every full_interval seconds, as a client may be replaced by another one).
+    The log has no cheap indicator, it is fetched every log_interval seconds and only entries newer than the log stores cursor are checked.
+    """
+
+    def __init__(self, client, hooks=(), interval: float = 0.5, full_interval: float = 60, log_interval: float = 10, store=None):
+        """
+        :param client: SpeedportClient of the router
+        :param hooks: list of callables taking an event dictionary
+        :param interval: seconds between two indicator polls
+        :param full_interval: max. seconds between two client fetches
+        :param log_interval: seconds between two log fetches, 0 to not watch the log
+        :param store: logstore.LogStore of the router, remembers the last checked log entry; None to not watch the log
+        """
+        self.client = client
+        self.hooks = HookRunner(hooks)
+        self.interval = interval
+        self.full_interval = full_interval
+        self.log_interval = log_interval
+        self.store = store
+        self.indicators = None  # indicator values of the last poll, None before the first poll
+        self.interfaces = {}  # interface id -> interface of the last client fetch
+        self.clients = {}  # mac address -> (interface id, client) of the last client fetch
+        self.last_full = 0  # time.monotonic() of the last client fetch
+        self.last_log = 0  # time.monotonic() of the last log fetch
+        self.polls = 0
+        self.fetches = 0  # number of client fetches
+
+    def event(self, name: str, **fields):
+        """
+        :param name: event type
+        :param fields: event data
+        :return: event dictionary
+        """
+        return dict({"event": name, "timestamp": time.time(), "router": self.client.address}, **fields)
+
+    def poll(self):
+        """
+        Poll the indicators and fetch clients and log if needed
+        :return: list of event dictionaries, already passed to the hooks
+        """
+        self.polls += 1
+        indicators = dict(self.client.send_request(indicator_names()))  # bypasses the cache, statuses are cached for a few seconds
+        events = []
+        now = time.monotonic()
+        if indicators != self.indicators or now - self.last_full >= self.full_interval:
+            events += self.fetch_clients(indicators, self.indicators is None)
+            self.indicators = indicators
+            self.last_full = now
+
+        if self.store is not None and self.log_interval > 0 and now - self.last_log >= self.log_interval:
+            events += self.fetch_log()
+            self.last_log = now
+
+        for event in events:
+            self.hooks.fire(event)
+        return events
+
+    def fetch_clients(self, indicators: dict, initial: bool):
+        """
+        Fetch interfaces and clients and compare them to the last fetch
+        :param indicators: indicator values of the current poll
+        :param initial: first fetch, only the state is stored
+        :return: list of events
+        """
+        self.fetches += 1
+        interfaces = self.client.wifi_interfaces()
+        for interface in interfaces:  # the status may be cached for a few seconds, the indicator is current
+            interface.up = indicators.get(f"Device.WiFi.SSID.{interface.id}.Status", "Up" if interface.up else "") == "Up"
+        interfaces = {interface.id: interface for interface in self.client.all_wifi_clients(interfaces)}
+        clients = {client.mac_address: (interface.id, client) for interface in interfaces.values() for client in interface.clients}
+
+        events = []
+        if not initial:
+            for interface_id, interface in interfaces.items():
+                previous = self.interfaces.get(interface_id)
+                if previous is not None and previous.up != interface.up:
+                    events.append(self.event("interface_up" if interface.up else "interface_down", interface=interface_id, ssid=interface.ssid))
+            for mac_address, (interface_id, client) in clients.items():
+                if mac_address not in self.clients:
+                    events.append(self.event("client_joined", interface=interface_id, **client.to_dict()))
+            for mac_address, (interface_id, client) in self.clients.items():
+                if mac_address not in clients:
+                    events.append(self.event("client_left", interface=interface_id, **client.to_dict()))
+
+        self.interfaces = interfaces
+        self.clients = clients
+        return events
+
+    def fetch_log(self):
+        """
+        Fetch the log and check the entries which are newer than the stores cursor
+        :return: list of events for entries flagged red
+        """
+        from . import logstore
+
+        initial = self.store.cursor is None  # nothing checked before, the existing log is only stored
+        entries = logstore.classify_lines(self.store.new_lines(self.client.syslog_lines()))
+        self.store.append(entries)
+        if initial:
+            return []
+        events = []
+        for entry in entries:
+            if entry.color == logparser.COLOR_RED:
+                fields = entry.to_dict()
+                fields["log_timestamp"] = fields.pop("timestamp")  # time of the router, the event timestamp is the time it was noticed
+                events.append(self.event("log_flagged", **fields))
+        return events
@@ -1,35 +1,118 @@
+from array import array
+
+
 class WifiClient:
     """
     Class representing a client device connected to a WiFi interface on the speedport.
     """
-    active = False
-    downstream_speed = -1
-    host_list_number = -1  # number in host list
-    host_name = ""
-    id = -1  # internal id for speedport
-    ip_address = ""
-    mac_address = ""
-    signal_strength = -1  # signal strength to client, measured by the speedport
-    upstream_speed = -1
+    __slots__ = ("active", "downstream_speed", "host_list_number", "host_name", "id", "ip_address", "mac_address", "signal_strength", "upstream_speed")
 
     def __init__(self, client_id: int):
-        self.id = client_id
+        self.active: bool = False
+        self.downstream_speed: int = -1
+        self.host_list_number: int = -1  # number in host list
+        self.host_name: str = ""
+        self.id: int = client_id  # internal id for speedport
+        self.ip_address: str = ""
+        self.mac_address: str = ""
+        self.signal_strength: int = -1  # signal strength to client, measured by the speedport
+        self.upstream_speed: int = -1
+
+    def to_dict(self):
+        """
+        Get the client as dictionary, e.g. for json output
+        :return: dictionary field name -> value
+        """
+        return {field: getattr(self, field) for field in self.__slots__}
 
 
 class WifiInterface:
     """
     Class representing a WiFI interface on the speedport
     """
-    channel = -1
-    clients = []  # associated clients with this interface
-    data_rate_max = -1  # max. data throughput rate
-    encryption = ""  # encryption method use, may be WPA2 etc.
-    frequency = ""
-    id = -1  # internal speedport interface id
-    mac_address = ""
-    ssid = ""
-    power = -1  # transmit power in percent
-    up = False  # state of the interface up (true)/down
+    __slots__ = ("channel", "clients", "data_rate_max", "encryption", "frequency", "id", "mac_address", "ssid", "power", "up")
 
     def __init__(self, interface_id: int):
-        self.id = interface_id
+        self.channel = -1
+        self.clients: list = []  # associated clients with this interface
+        self.data_rate_max = -1  # max. data throughput rate
+        self.encryption: str = ""  # encryption method use, may be WPA2 etc.
+        self.frequency: str = ""
+        self.id: int = interface_id  # internal speedport interface id
+        self.mac_address: str = ""
+        self.ssid: str = ""
+        self.power = -1  # transmit power in percent
+        self.up: bool = False  # state of the interface up (true)/down
+
+    def to_dict(self, with_clients: bool = False):
+        """
+        Get the interface as dictionary, e.g. for json output
+        :param with_clients: add the client list (as list of dictionaries)
+        :return: dictionary field name -> value
+        """
+        data = {field: getattr(self, field) for field in self.__slots__ if field != "clients"}
+        if with_clients:
+            data["clients"] = [client.to_dict() for client in self.clients]
+        return data
+
+
+class ClientTable:
+    """
+    Class holding a snapshot of many clients (e.g. of all interfaces) in columns.
+    Numeric fields are stored in typed arrays instead of one object per client, which keeps bulk snapshots small.
+    """
+    __slots__ = ("interface_ids", "client_ids", "signal_strengths", "downstream_speeds", "upstream_speeds", "active", "mac_addresses", "ip_addresses", "host_names")
+
+    def __init__(self):
+        self.interface_ids = array("H")
+        self.client_ids = array("H")
+        self.signal_strengths = array("h")
+        self.downstream_speeds = array("q")
+        self.upstream_speeds = array("q")
+        self.active = bytearray()
+        self.mac_addresses = []
+        self.ip_addresses = []
+        self.host_names = []
+
+    def __len__(self):
+        return len(self.client_ids)
+
+    def append(self, interface_id: int, client: WifiClient):
+        """
+        Add a client to the table
+        :param interface_id: id of the interface the client is associated with
+        :param client: the client
+        """
+        self.interface_ids.append(interface_id)
+        self.client_ids.append(client.id)
+        self.signal_strengths.append(client.signal_strength)
+        self.downstream_speeds.append(client.downstream_speed)
+        self.upstream_speeds.append(client.upstream_speed)
+        self.active.append(client.active)
+        self.mac_addresses.append(client.mac_address)
+        self.ip_addresses.append(client.ip_address)
+        self.host_names.append(client.host_name)
+
+    def extend(self, interface: WifiInterface):
+        """
+        Add all clients of an interface to the table
+        :param interface: the interface, with completed client list
+        """
+        for client in interface.clients:
+            self.append(interface.id, client)
+
+    def client(self, row: int):
+        """
+        Get a single row of the table as client object
+        :param row: row number
+        :return: tuple (interface id, client)
+        """
+        client = WifiClient(client_id=self.client_ids[row])
+        client.signal_strength = self.signal_strengths[row]
+        client.downstream_speed = self.downstream_speeds[row]
+        client.upstream_speed = self.upstream_speeds[row]
+        client.active = bool(self.active[row])
+        client.mac_address = self.mac_addresses[row]
+        client.ip_address = self.ip_addresses[row]
+        client.host_name = self.host_names[row]
+        return self.interface_ids[row], client
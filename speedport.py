@@ -1,12 +1,34 @@
+from classes import cache
+from classes import commands
+from classes import exporter
+from classes import fleet
+from classes import loganalytics
+from classes import logparser
+from classes import logstore
+from classes import output
+from classes import poller
+from classes import profiling
+from classes import recorder
+from classes import scheduler
+from classes import soap
+from classes import watcher
 from classes import wifi
+from classes.client import SpeedportClient
+from classes.colors import BashColors
 import time
 import argparse
+import functools
 import os
-import requests
-import urllib3
-import hashlib
-import xmltodict
-from tabulate import tabulate
+import sys
+
+# state of the command line run, used by main and the exit handlers
+speedport_client = None  # client of the command line router
+print_stats = False  # print cache counters before exiting
+profiler = profiling.Profiler(enabled=False)  # measures the phases of requests and commands, enabled with --profile
+profile_format = None  # table or json, None if no profile is printed
+notice_stream = sys.stdout  # stream for notices and errors, stderr if structured output is written to stdout
+redraws_screen = False  # the output is redrawn in place (dynamic -wi and dashboard), the screen is cleared on Ctrl+C
+POLL_ERRORS = (OSError, soap.SoapFault, scheduler.CircuitOpenError)  # router not reachable or overloaded, polling loops show the error and keep polling
 
 
 # these classes are needed in order to use multiple argparse formatters
@@ -18,224 +40,78 @@ class FormatterHelp(Formatter, argparse.RawTextHelpFormatter):
     pass
 
 
-# class holding bash color codes for colored output
-class BashColors:
-    default = '\33[39m'
-    reset = '\33[0m'
-    bold = '\33[1m'
-    black = '\33[30m'
-    blue = '\33[34m'
-    magenta = '\33[35m'
-    cyan = '\33[36m'
-    light_red = '\33[91m'
-    light_green = '\33[92m'
-    white = '\33[97m'
-
-    class Background:
-        default = '\33[49m'
-        red = '\33[41m'
-        green = '\33[42m'
-        yellow = '\33[43m'
-        blue = '\33[44m'
-        magenta = '\33[45m'
-        cyan = '\33[46m'
-        light_grey = '\33[47m'
-        dark_grey = '\33[100m'
-        light_green = '\33[102m'
-        light_yellow = '\33[103m'
-        light_magenta = '\33[105m'
-        light_cyan = '\33[106m'
-        white = '\33[107m'
-
-
-def get_request(parameter_list):
-    """
-    Method to get soap data for given parameters
-    :param parameter_list: list of string parameters, to specify data to get
-    :return: dictionary which contains parsed XML response
-    """
-    global ipAddress, headers, password
-    if len(parameter_list) == 0:
-        return None
-
-    # convert given parameters to correct xml syntax
-    parameter_string = ""
-    for parameter in parameter_list:
-        parameter_string += f"<xsd:string>{parameter}</xsd:string>\n"
-
-    # data string for SOAP request todo: maybe use xml parser
-    data = f"<soap-env:Envelope xmlns:soap-env=\"http://schemas.xmlsoap.org/soap/envelope/\" xmlns:xsi=\"http://www.w3.org/2001/XMLSchema-instance\" xmlns:xsd=\"http://www.w3.org/2001/XMLSchema\"" \
-           f"xmlns:cwmp=\"urn:telekom-de.totr64-2-n\"><soap-env:Body><cwmp:GetParameterValues xmlns:cwmp=\"urn:dslforum-org:cwmp-1-0\"><cwmp:ParameterNames length=\"{len(parameter_list)}\">" \
-           f"{parameter_string}</cwmp:ParameterNames></cwmp:GetParameterValues></soap-env:Body></soap-env:Envelope>"
-
-    # send request with data
-    request = requests.post(url=f"https://{ipAddress}:49443/", headers=headers, data=data, verify=False)
-
-    # if header is set, authentication is needed; calculate hash, set authorization header and resend the request
-    if "WWW-Authenticate" in request.headers:
-        if password is None:
-            exit_with_error_message(1, "[-] Request needs authentication, but no password was set.")
-        wwa = request.headers["WWW-Authenticate"]
-
-        # basic SOAP digest auth
-        nonce = wwa[wwa.index("nonce") + 7:][:-1]
-        hash1 = hashlib.md5(f"dslf-config:BT:{password}".encode()).hexdigest()
-        hash2 = hashlib.md5("POST:/".encode()).hexdigest()
-        response = hashlib.md5(f"{hash1}:{nonce}:{hash2}".encode())
-
-        auth_headers = headers  # use global header and add auth header
-        auth_headers["Authorization"] = f"Digest username=\"dslf-config\", realm=\"BT\", nonce=\"{nonce}\", uri=\"/\", response=\"{response.hexdigest()}\", algorithm=MD5"
-        request = requests.post(url=f"https://{ipAddress}:49443/", headers=auth_headers, data=data, verify=False)
-
-    # print(request.text)
-    return xmltodict.parse(request.text)
-
-
-def get_all_wifi_interfaces():
-    """
-    Get information about all available WiFi interfaces
-    :return: list with interfaces
-    """
-    # first request: retrieve status for all interfaces
-    parameter_list = []
-    for x in range(1, 8):
-        parameter_list.append(f"Device.WiFi.SSID.{x}.Status")
-    raw_data = get_request(parameter_list)["SOAP-ENV:Envelope"]["SOAP-ENV:Body"]["u:GetParameterValuesResponse"]["ParameterList"]["ParameterValueStruct"]
-
-    # second request: get bssid (mac) and ssid as well as additional info, if interface is up
-    interfaces = []
-    parameter_list = []
-    for entry in raw_data:
-        interface = wifi.WifiInterface(interface_id=int(entry["Name"].split(".")[3]))  # initialize interface object
-        interface.up = entry["Value"]["#text"] == "Up"  # set state
-        interfaces.append(interface)
-
-        # add mac address (bssid) and ssid for current interface to parameter list
-        parameter_list.append(f"Device.WiFi.SSID.{interface.id}.SSID")
-        parameter_list.append(f"Device.WiFi.SSID.{interface.id}.BSSID")
-
-        if interface.up:  # get more info, which is only available when interface is uo
-            parameter_list.append(f"Device.WiFi.Radio.{interface.id}.SupportedFrequencyBands")  # frequency
-            parameter_list.append(f"Device.WiFi.Radio.{interface.id}.Channel")  # channel
-            parameter_list.append(f"Device.WiFi.Radio.{interface.id}.TransmitPower")  # transmit power
-            parameter_list.append(f"Device.WiFi.Radio.{interface.id}.MaxBitRate")  # max bitrate
-            parameter_list.append(f"Device.WiFi.AccessPoint.{interface.id}.Security.ModeEnabled")  # encryption method used
-
-    raw_data = get_request(parameter_list)["SOAP-ENV:Envelope"]["SOAP-ENV:Body"]["u:GetParameterValuesResponse"]["ParameterList"]["ParameterValueStruct"]  # request for additional info
-
-    # add missing information to the interface objects
-    for entry in raw_data:
-        id = int(entry["Name"].split(".")[3])  # speedport interface id
-
-        # find list index for needed interface (with same id)
-        index = -1
-        for x in range(0, len(interfaces)):
-            if interfaces[x].id == id:
-                index = x
-                break
-
-        if index == -1:  # exit if index is -1, wat means that a interface with given number wasn't found in list
-            exit_with_error_message(1, "Interface not in list")
-
-        type: str = entry["Name"].split(".")[4]  # entry type
-        if type == "SSID":
-            interfaces[index].ssid = entry["Value"]["#text"]
-        elif type == "BSSID":
-            interfaces[index].mac_address = entry["Value"]["#text"] if "#text" in entry["Value"] else "NA"
-        elif type == "SupportedFrequencyBands":
-            interfaces[index].frequency = entry["Value"]["#text"]
-        elif type == "Channel":
-            interfaces[index].channel = entry["Value"]["#text"]
-        elif type == "TransmitPower":
-            interfaces[index].power = entry["Value"]["#text"]
-        elif type == "MaxBitRate":
-            interfaces[index].data_rate_max = entry["Value"]["#text"]
-        elif type == "Security":
-            interfaces[index].encryption = entry["Value"]["#text"]
-    return interfaces
-
-
-def get_clients_for_wifi_interface(interface):
-    """
-    Get all clients associated to a WiFi interface
-    :param interface: the interface
-    :return: the passed interface, but with completed client list
-    """
-    raw_data = \
-        get_request([f"Device.WiFi.AccessPoint.{interface.id}.AssociatedDevice."])["SOAP-ENV:Envelope"]["SOAP-ENV:Body"]["u:GetParameterValuesResponse"]["ParameterList"]["ParameterValueStruct"]
-    clients = []
-
-    for entry in raw_data:
-        id = int(entry["Name"].split(".")[5])  # device id
-        entry_type = entry["Name"].split(".")[6]
-
-        # check if client already in list, if not add id
-        index = -1
-        for x in range(0, len(clients)):
-            if clients[x].id == id:
-                index = x
-                break
-
-        if index == -1:
-            clients.append(wifi.WifiClient(client_id=id))
-            index = len(clients) - 1  # last index
-
-        # add fields
-        if entry_type == "MACAddress":
-            clients[index].mac_address = entry["Value"]["#text"]
-        elif entry_type == "LastDataDownlinkRate":
-            clients[index].downstream_speed = int(entry["Value"]["#text"])
-        elif entry_type == "LastDataUplinkRate":
-            clients[index].upstream_speed = int(entry["Value"]["#text"])
-        elif entry_type == "SignalStrength":
-            clients[index].signal_strength = int(entry["Value"]["#text"])
-
-    raw_data = get_request([f"Device.Hosts.Host."])["SOAP-ENV:Envelope"]["SOAP-ENV:Body"]["u:GetParameterValuesResponse"]["ParameterList"]["ParameterValueStruct"]  # get device data
-
-    for entry in raw_data:
-        id = int(entry["Name"].split(".")[3])
-        entry_type = entry["Name"].split(".")[4]
-
-        if entry_type == "PhysAddress":
-            for client in clients:
-                if client.mac_address == entry["Value"]["#text"] and client.host_list_number == -1:
-                    client.host_list_number = id
-
-        elif entry_type == "IPAddress":
-            for client in clients:
-                if client.host_list_number == id:
-                    client.ipAddress = entry["Value"]["#text"] if "#text" in entry["Value"] else "NA"
-        elif entry_type == "HostName":
-            for client in clients:
-                if client.host_list_number == id:
-                    client.hostName = entry["Value"]["#text"] if "#text" in entry["Value"] else "NA"
-        elif entry_type == "Active":
-            for client in clients:
-                if client.host_list_number == id:
-                    client.active = entry["Value"]["#text"] == "true"
-
-    interface.clients = clients
-    return interface
-
-
-def get_external_ips():
-    """
-    Get the speedport's external IPs
-    :return str: ip address(es) or Error
-    """
-
-    parameter_list = []
-    for x in range(2, 6):
-        parameter_list.append(f"Device.IP.Interface.{x}.Alias")
-        parameter_list.append(f"Device.IP.Interface.{x}.IPv4Address.1.IPAddress")
-        # parameter_list.append(f"Device.IP.Interface.{x}.IPv6Address.1.IPAddress")
-    raw_data = get_request(parameter_list)["SOAP-ENV:Envelope"]["SOAP-ENV:Body"]["u:GetParameterValuesResponse"]["ParameterList"]["ParameterValueStruct"]
-
-    # merge ip data rows
-    merged_data = []
-    for x in range(0, int(len(raw_data))):
-        if x % 2 == 0:
-            merged_data.append([raw_data[x]["Value"]["#text"], raw_data[x + 1]["Value"]["#text"] if "#text" in raw_data[x + 1]["Value"] else "NA"])
+def profiled(span_name):
+    """
+    Decorator measuring a function with the profiler of the command line router
+    :param span_name: phase name, e.g. render
+    :return: decorator
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with profiler.span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@profiled("render")
+def format_wifi_interfaces(interfaces):
+    """
+    Format information about all WiFi interfaces as table
+    :param interfaces: list of interfaces
+    :return str: formatted output
+    """
+    from tabulate import tabulate  # only needed for text output
+
+    data = []
+    for interface in interfaces:
+        if interface.up:
+            data.append([f"{BashColors.light_green}{interface.id}", interface.frequency, interface.mac_address, interface.ssid, interface.channel, interface.encryption, interface.power,
+                         f"{interface.data_rate_max}{BashColors.reset}"])
+
+        else:
+            data.append([f"{BashColors.light_red}{interface.id}", interface.frequency, interface.mac_address, f"{interface.ssid}{BashColors.reset}"])
+
+    return f"= = = = = WiFi interface Information = = = = = ({BashColors.light_green}UP{BashColors.reset}) ({BashColors.light_red}DOWN{BashColors.reset})\n" + \
+           tabulate(data, headers=["No.", "Frequency", "MAC", "SSID", "Channel", "Encryption", "Power (%)", "MaxDataRate (mbit/s)"])
+
+
+@profiled("render")
+def format_wifi_interface(interface):
+    """
+    Format information about a WiFi interface and its clients
+    :param interface: the interface, with completed client list
+    :return str: formatted output
+    """
+    from tabulate import tabulate  # only needed for text output
+
+    output = f"= = = = = Information for interface {interface.id} = = = = =\n"
+    state_color = BashColors.light_green if interface.up else BashColors.light_red
+    output += f"{state_color}Frequency: {interface.frequency}, SSID: {interface.ssid}, MAC: {interface.mac_address}\n" \
+              f"{state_color}Channel: {interface.channel}, Power: {interface.power}%, Encryption: {interface.encryption}\n"
+
+    output += f"{BashColors.cyan}Clients {str(len(interface.clients))}{BashColors.reset}"
+    if len(interface.clients) > 0:
+        data = []
+        for client in interface.clients:
+            if client.active:
+                data.append([client.mac_address, client.ip_address,
+                             f"{(BashColors.light_red if client.signal_strength < -70 else BashColors.light_green)}{str(client.signal_strength)}{BashColors.reset}", client.host_name,
+                             client.downstream_speed, client.upstream_speed])
+
+        output += "\n" + tabulate(data, headers=["MAC", "IP", "Signal strength", "Host-Name", "Downlink", "Uplink"])
+    return output
+
+
+@profiled("render")
+def format_external_ips(addresses):
+    """
+    Format the speedport's external IPs
+    :param addresses: list of dictionaries, as returned by get_external_ip_list
+    :return str: ip address(es)
+    """
+    merged_data = [[entry["interface"], entry["address"] if entry["address"] != "" else "NA"] for entry in addresses]
 
     output = BashColors.reset + "==== External interfaces - IPv4 addresses ====\n"
     for entry in merged_data:
@@ -251,216 +127,404 @@ def get_external_ips():
     return output
 
 
-def print_syslog(entry_count, exclude_string, include):
+@profiled("render")
+def format_client_history(statistics):
+    """
+    Format recorded client statistics as table
+    :param statistics: list of dictionaries, as returned by ClientRecorder.query
+    :return str: formatted output
+    """
+    from tabulate import tabulate  # only needed for text output
+
+    data = []
+    for entry in statistics:
+        signal = entry["signal_strength"]
+        data.append([entry["mac_address"], entry["interface"], entry["samples"],
+                     f"{(BashColors.light_red if signal['min'] < -70 else BashColors.light_green)}{signal['min']}{BashColors.reset}", f"{signal['avg']:.1f}", signal["p50"],
+                     signal["p95"], f"{entry['downstream_speed']['avg']:.0f}", entry["downstream_speed"]["p5"], f"{entry['upstream_speed']['avg']:.0f}",
+                     entry["upstream_speed"]["p5"]])
+
+    return "= = = = = Recorded clients = = = = =\n" + \
+           tabulate(data, headers=["MAC", "Interface", "Samples", "Signal min", "Signal avg", "Signal p50", "Signal p95", "Downlink avg", "Downlink p5",
+                                   "Uplink avg", "Uplink p5"])
+
+
+def format_event(event):
+    """
+    Format an event of the watch mode as one line
+    :param event: event dictionary, as created by watcher.Watcher
+    :return str: formatted output
+    """
+    timestamp = time.strftime("%H:%M:%S", time.localtime(event["timestamp"]))
+    name = event["event"]
+    if name in ("client_joined", "client_left"):
+        color = BashColors.light_green if name == "client_joined" else BashColors.light_red
+        details = f"{event['mac_address']} {event['ip_address']} {event['host_name']} (interface {event['interface']}, signal {event['signal_strength']})"
+    elif name in ("interface_up", "interface_down"):
+        color = BashColors.light_green if name == "interface_up" else BashColors.light_red
+        details = f"{event['interface']} {event['ssid']}"
+    else:  # log_flagged
+        color = BashColors.light_red
+        details = event["line"]
+    return f"{timestamp} {color}{name}{BashColors.reset} {details}"
+
+
+def print_syslog(client, entry_count, exclude_string, include):
     """
     print colored syslog
+    :param client: SpeedportClient of the router to query
     :param int entry_count: number of entries that should be printed, if -1 all
     :param str exclude_string: string containing information on which messages should be excluded or -if include==True - should be included
     :param bool include: determines whether to include or exclude messages given in exclude_string
     """
-    '''
-    possible message groups:
-    e: E-Mail Notifications,
-    wui: Logins and session timeouts in web interface,
-    t: time messages
-    v: Voice (telephony)
-    dd: Dynamic DNS
-    l: LTE and SIM Card
-    d: DSL and configurator service
-    i: IGMP
-    w: WiFi
-    vpn: VPN
-    dh: DHCP
-    u: unclassified
-    '''
-
-    # if include is set, convert input to exclude all other groups
-    possible_options = ["e", "wui", "t", "v", "dd", "l", "d", "i", "w", "vpn", "dh", "u"]
-    if include:
-        split = exclude_string.split(",")
-        excluded_options = []
-        for x in split:
-            for y in possible_options:
-                if not x == y:
-                    excluded_options.append(y)
-        exclude_string = ",".join(excluded_options)
-
-    ex_mails = False
-    ex_web_sessions = False
-    ex_time = False
-    ex_voice = False
-    ex_ddns = False
-    ex_lte = False
-    ex_dsl = False
-    ex_igmp = False
-    ex_wifi = False
-    ex_vpn = False
-    ex_dhcp = False
-    ex_unclassified = False
-
-    # set booleans for excluded message groups
-    split_exclude = exclude_string.split(",")
-    for exclusion in split_exclude:
-        if exclusion == "e":
-            ex_mails = True
-        elif exclusion == "wui":
-            ex_web_sessions = True
-        elif exclusion == "t":
-            ex_time = True
-        elif exclusion == "v":
-            ex_voice = True
-        elif exclusion == "dd":
-            ex_ddns = True
-        elif exclusion == "l":
-            ex_lte = True
-        elif exclusion == "d":
-            ex_dsl = True
-        elif exclusion == "i":
-            ex_igmp = True
-        elif exclusion == "w":
-            ex_wifi = True
-        elif exclusion == "vpn":
-            ex_vpn = True
-        elif exclusion == "dh":
-            ex_dhcp = True
-        elif exclusion == "u":
-            ex_unclassified = True
-
-    # get syslog data
-    raw_data = get_request(["Device.DeviceInfo.X_T-ONLINE-DE_DeviceLog"])["SOAP-ENV:Envelope"]["SOAP-ENV:Body"]["u:GetParameterValuesResponse"]["ParameterList"]["ParameterValueStruct"]["Value"]["#text"]
-    # print(raw_data)
-
-    sp = raw_data.split("\n")  # split data
-
-    # determine entry count
-    if entry_count == -1 or entry_count > len(sp):
-        entry_count = len(sp)
-
-    # color code and print messages
-    for x in range(entry_count - 1, 0, -1):
-
-        # get raw message type
-        raw_msg_type = sp[x][22:28]
-        if raw_msg_type[-1] == ")":
-            raw_msg_type = raw_msg_type[:-1]
-        elif raw_msg_type[-2] == ")":
-            raw_msg_type = raw_msg_type[:-2]
-
-        # get actual message type
-        msg_type = ""
-        msg_number = -1
-        if len(raw_msg_type) == 4:
-            msg_type = raw_msg_type[0:1]
-            msg_number = raw_msg_type[1:]
-        elif len(raw_msg_type) == 5:
-            msg_type = raw_msg_type[0:2]
-            msg_number = raw_msg_type[2:]
-        else:  # len >6
-            msg_type = raw_msg_type[0:3]
-            msg_number = raw_msg_type[3:]
-
-        # default values
-        print_line = True  # print every line, if not excluded
-        color_start = BashColors.Background.white + BashColors.black  # default line color (white bg + black text)
-        color_end = BashColors.Background.default + BashColors.default  # default color end (default colors)
-
-        if msg_type == "W":  # WiFi
-            color_start = BashColors.Background.cyan
-            if ex_wifi:
-                print_line = False
-            if msg_number == "005":  # 005=failed wifi device auth
-                color_start = BashColors.Background.red + BashColors.black
-        elif msg_type == "IG":  # IGMP
-            color_start = BashColors.Background.dark_grey
-            if ex_igmp:
-                print_line = False
-        elif msg_type == "VPN":  # VPN
-            color_start = BashColors.Background.light_grey + BashColors.black
-            if ex_vpn:
-                print_line = False
-        elif msg_type == "R" or msg_type == "A" or msg_type == "P":  # DSL Line, configuration service
-            color_start = BashColors.Background.magenta + BashColors.black
-            if ex_dsl:
-                print_line = False
-            if msg_number == "009" or msg_number == "013" or msg_number == "020" or msg_number == "004":  # 004=no prefix, 020=pppoe timeout, 013=lost sync
-                color_start = BashColors.Background.red + BashColors.black
-        elif msg_type == "HA" or msg_type == "HYB" or msg_type == "LT" or msg_type == "SI":  # LTE, SIM Card
-            color_start = BashColors.Background.light_magenta + BashColors.black
-            if ex_lte:
-                print_line = False
-            if msg_number == "001" or msg_number == "002" or msg_number == "210" or msg_number == "213":  # 002=hybrid server not reachable via dsl, 213(no error)=time for lte ipv6 renewal, 001=sim not available
-                color_start = BashColors.Background.red + BashColors.black
-        elif msg_type == "D":  # dynamic dns
-            color_start = BashColors.Background.light_green + BashColors.black
-            if ex_ddns:
-                print_line = False
-            if msg_number == "001":
-                color_start = BashColors.Background.red + BashColors.black
-        elif msg_type == "V":  # voice
-            color_start = BashColors.Background.blue
-            if ex_voice:
-                print_line = False
-            if msg_number == "006":
-                color_start = BashColors.Background.red + BashColors.black
-        elif msg_type == "T" or msg_type == "NT":  # time
-            color_start = BashColors.Background.green + BashColors.black
-            if ex_time:
-                print_line = False
-            if msg_number == "102" or msg_number == "000":  # 102=time sync failed, 000=time not available
-                color_start = BashColors.Background.red + BashColors.black
-        elif msg_type == "EP":  # email notifications
-            color_start = BashColors.Background.yellow + BashColors.black
-            if ex_mails:
-                print_line = False
-        elif msg_type == "G":  # web interface sessions
-            color_start = BashColors.Background.light_yellow + BashColors.black
-            if ex_web_sessions:
-                print_line = False
-        elif msg_type == "DH":  # dhcp
-            color_start = BashColors.Background.light_cyan + BashColors.black
-            if ex_dhcp:
-                print_line = False
-        else:  # unclassified
-            if ex_unclassified:
-                print_line = False
-
-        if print_line:
-            print(f"{color_start}{sp[x]}{color_end}")
-
-
-def get_uptime():
-    global browser, ipAddress, webInterfaceVersion, timeFactor
-
-    browser.get("http://" + ipAddress + "/" + webInterfaceVersion + "/gui/engineer/html/version.html/")
-    time.sleep(0.5 * timeFactor)
-
-    uptime_seconds = -1
-    spans = browser.find_elements_by_tag_name("span")
-    for span in spans:
-        if span.get_attribute("ng-bind") == "fields.uptime":
-            uptime_seconds = int(span.text)
-            break
-
-    if not uptime_seconds == -1:
-        unix_time = int(time.time())
-        uptime = unix_time - uptime_seconds
-        return time.strftime("%Y-%m-%d %H-%M-%S", time.localtime(uptime))
-    return "Error"
+    for line in format_syslog(client.syslog_entries(entry_count, logparser.excluded_groups(exclude_string, include))):
+        print(line)
+
+
+def format_syslog_entry(entry):
+    """
+    Color a classified log entry
+    :param entry: logstore.LogEntry
+    :return str: colored line
+    """
+    return f"{entry.color}{entry.line}{BashColors.Background.default + BashColors.default}"
+
+
+@profiled("render")
+def format_syslog(entries):
+    """
+    color code syslog entries
+    :param entries: list of logstore.LogEntry
+    :return: list of colored lines
+    """
+    return [format_syslog_entry(entry) for entry in entries]
+
+
+@profiled("render")
+def print_syslog_entries(entries, writer=None):
+    """
+    Print classified log entries
+    :param entries: list of logstore.LogEntry
+    :param writer: output.RecordWriter for structured output, None for colored text
+    """
+    if writer is not None:
+        writer.write([entry.to_dict() for entry in entries])
+    else:
+        for entry in entries:
+            print(format_syslog_entry(entry))
+
+
+def format_duration(seconds):
+    """
+    :param seconds: duration, None if unknown
+    :return str: duration like 2d 03:04:05
+    """
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    text = f"{seconds // 3600 % 24:02}:{seconds // 60 % 60:02}:{seconds % 60:02}"
+    return f"{seconds // 86400}d {text}" if seconds >= 86400 else text
+
+
+@profiled("render")
+def format_log_statistics(analyzer):
+    """
+    Format the results of a log analysis as tables
+    :param analyzer: loganalytics.LogAnalyzer
+    :return str: formatted output
+    """
+    from tabulate import tabulate  # only needed for text output
+
+    def rows(statistics, flagged=()):
+        data = []
+        for key, entry in sorted(statistics.items(), key=lambda item: item[1].count, reverse=True):
+            busiest = max(entry.hours.items(), key=lambda item: item[1], default=("-", 0))
+            color = BashColors.light_red if key in flagged else ""
+            data.append([f"{color}{key}{BashColors.reset if color else ''}", entry.count, loganalytics.format_seconds(entry.first), loganalytics.format_seconds(entry.last),
+                         format_duration(entry.gap_sum / entry.gaps if entry.gaps > 0 else None), format_duration(entry.gap_min), format_duration(entry.gap_max),
+                         f"{busiest[0]} ({busiest[1]})"])
+        return data
+
+    headers = ["Events", "First", "Last", "Avg. gap", "Min. gap", "Max. gap", "Busiest hour"]
+    output = f"= = = = = Log statistics = = = = = ({analyzer.lines} lines, {analyzer.unclassified} without message code)\n"
+    output += tabulate(rows(analyzer.groups), headers=["Group"] + headers) + "\n\n"
+    output += tabulate(rows(analyzer.codes, analyzer.flagged), headers=["Code"] + headers)
+
+    # events per hour of the codes flagged red (lost dsl sync, lte fallback, ...)
+    flagged = sorted(code for code in analyzer.flagged if code in analyzer.codes)
+    hours = sorted(set(hour for code in flagged for hour in analyzer.codes[code].hours))
+    if len(hours) > 0:
+        data = [[hour] + [analyzer.codes[code].hours.get(hour, "") for code in flagged] for hour in hours]
+        output += f"\n\n{BashColors.light_red}Flagged events per hour{BashColors.reset}\n" + tabulate(data, headers=["Hour"] + flagged)
+    return output
+
+
+def update_syslog_store(client, store, lines=None):
+    """
+    Get the syslog and add entries, which are newer than the stores cursor, to the store
+    :param client: SpeedportClient of the router to query
+    :param store: logstore.LogStore of the router
+    :param lines: already fetched log lines (newest entry first), if None the log is requested
+    :return: tuple (all log lines newest entry first, list of new logstore.LogEntry oldest entry first)
+    """
+    if lines is None:
+        lines = client.syslog_lines()
+    entries = logstore.classify_lines(store.new_lines(lines))
+    failed = store.write_error is not None
+    if not store.append(entries) and not failed:  # reported once, the command works without the cache
+        print_notice(f"[i] Log cache not writable, entries are not stored: {store.write_error}")
+    return lines, entries
+
+
+def print_poll_error(error, renderer=None):
+    """
+    Show an error of a polling loop, which keeps polling
+    :param error: exception raised by the poll
+    :param renderer: poller.ScreenRenderer of a loop redrawing in place, the error replaces its last line; None to print it as notice
+    """
+    message = f"{BashColors.light_red}[-] {error}{BashColors.reset}"
+    if renderer is None:
+        print_notice(message)
+        return
+    with profiler.span("render"):
+        renderer.render((renderer.lines or [])[:-1] + [message])
+
+
+def follow_syslog(client, store, entry_count, excluded_groups, refresh_time, writer=None):
+    """
+    Print new syslog entries as they appear (like tail -f)
+    :param client: SpeedportClient of the router to query
+    :param store: logstore.LogStore of the router
+    :param int entry_count: number of already existing entries to print first, if -1 all
+    :param excluded_groups: set of message groups which should not be printed
+    :param float refresh_time: seconds to wait between two polls
+    :param writer: output.RecordWriter for structured output, None for colored text
+    """
+    first = True
+    while True:
+        try:
+            lines = client.syslog_lines()
+        except POLL_ERRORS as e:  # router not reachable, keep following
+            print_poll_error(e)
+            time.sleep(refresh_time)
+            continue
+
+        if first:  # entries which were stored before are shown as well
+            first = False
+            update_syslog_store(client, store, lines)
+            entries = store.read(entry_count) if store.write_error is None else logstore.select_entries(lines, entry_count)
+        else:
+            entries = update_syslog_store(client, store, lines)[1]
+
+        entries = [entry for entry in entries if entry.group not in excluded_groups]
+        if len(entries) > 0:  # empty batches would write an empty json array per poll
+            print_syslog_entries(entries, writer)
+        time.sleep(refresh_time)
+
+
+@profiled("render")
+def format_device_info(info):
+    """
+    Format model, firmware, uptime and dsl sync rates of the speedport
+    :param info: dictionary, as returned by SpeedportClient.device_info
+    :return str: formatted output
+    """
+    output = "= = = = = Device information = = = = =\n"
+    output += f"Model: {info['manufacturer']} {info['model']} (hardware {info['hardware_version']}, serial number {info['serial_number']})\n"
+    output += f"Firmware: {info['software_version']}\n"
+    if info["uptime"] != -1:
+        output += f"Uptime: {format_duration(info['uptime'])} (since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info['boot_time']))})\n"
+    else:
+        output += f"Uptime: {BashColors.light_red}NA{BashColors.reset}\n"
+    if info["downstream_rate"] != -1:
+        output += f"DSL: {info['downstream_rate'] / 1000:.1f} mbit/s down, {info['upstream_rate'] / 1000:.1f} mbit/s up"
+    else:
+        output += f"DSL: {BashColors.light_red}not synchronized{BashColors.reset}"
+    return output
+
+
+def collect_router(router, deadline, collect_wifi, collect_ips, log_entries, structured=False, port=49443, timeout=None, retries=2, rate_limit=0):
+    """
+    Collect information from a single router of the fleet, with its own client
+    :param router: fleet.Router to poll
+    :param float deadline: time.monotonic() value after which no request is repeated
+    :param bool collect_wifi: collect wifi interface information
+    :param bool collect_ips: collect external ip addresses
+    :param int log_entries: number of log entries to collect, 0 for none
+    :param bool structured: return a dictionary instead of formatted text
+    :param int port: port of the TR-064 interface, if the inventory doesn't set one
+    :param timeout: seconds to wait for each request, or tuple of connect and read timeout, None waits forever
+    :param int retries: max. number of repetitions of a failed request
+    :param float rate_limit: max. number of requests per second, 0 for no limit
+    :return str: formatted output for this router
+    """
+    # all selected information is requested together
+    selected = {}
+    if collect_wifi:
+        selected["wifi"] = commands.wifi_interfaces()
+    if collect_ips:
+        selected["ips"] = commands.external_ips()
+    if log_entries != 0:
+        selected["log"] = commands.syslog()
+    request_scheduler = scheduler.RequestScheduler(retries, rate_limit=scheduler.TokenBucket(rate_limit, burst=4) if rate_limit > 0 else None,
+                                                   breaker=scheduler.CircuitBreaker(), is_transient=soap.is_transient, deadline=deadline)
+    with SpeedportClient(router.address, router.password, port=router.port if router.port is not None else port, timeout=timeout, profiler=profiler,
+                         scheduler=request_scheduler) as client:
+        results = dict(zip(selected, client.run(list(selected.values()))))
+
+    if structured:
+        data = {}
+        if collect_wifi:
+            data["wifi"] = [interface.to_dict() for interface in results["wifi"]]
+        if collect_ips:
+            data["ips"] = results["ips"]
+        if log_entries != 0:
+            data["log"] = [entry.to_dict() for entry in logstore.select_entries(results["log"], log_entries)]
+        return data
+
+    output = []
+    if collect_wifi:
+        output.append(format_wifi_interfaces(results["wifi"]))
+    if collect_ips:
+        output.append(format_external_ips(results["ips"]))
+    if log_entries != 0:
+        output.append("\n".join(format_syslog(logstore.select_entries(results["log"], log_entries))))
+    return "\n".join(output)
+
+
+def print_fleet(inventory_path, collect_wifi, collect_ips, log_entries, workers, timeout, writer=None, client_options=None):
+    """
+    Poll all routers of the inventory at the same time and print the aggregated output
+    :param str inventory_path: path to the inventory file
+    :param bool collect_wifi: collect wifi interface information
+    :param bool collect_ips: collect external ip addresses
+    :param int log_entries: number of log entries to collect, 0 for none
+    :param int workers: max. number of routers polled in parallel
+    :param float timeout: seconds to wait for a single router
+    :param writer: output.RecordWriter for structured output (one record per router), None for colored text
+    :param dict client_options: port, timeout, retries and rate_limit of the command line, see collect_router
+    """
+    import configparser
+
+    try:
+        routers = fleet.read_inventory(inventory_path)
+    except (OSError, configparser.Error) as e:
+        exit_with_error_message(1, f"Could not read inventory: {e}")
+
+    results = fleet.poll_fleet(routers, functools.partial(collect_router, collect_wifi=collect_wifi, collect_ips=collect_ips, log_entries=log_entries, structured=writer is not None,
+                                                         **(client_options or {})), max_workers=workers, timeout=timeout)
+    if writer is not None:
+        writer.write([{"router": result.router.name, "address": result.router.address, "error": result.error, "duration": result.duration, "data": result.result} for result in results])
+        return
+
+    for result in results:
+        print(f"{BashColors.bold}# # # # # {result.router.name} ({result.router.address}) # # # # #{BashColors.reset}")
+        if result.error != "":
+            print(f"{BashColors.light_red}[-] {result.error}{BashColors.reset}")
+        else:
+            print(result.result)
+    failed = sum(1 for result in results if result.error != "")
+    print(f"[i] {len(results) - failed} of {len(results)} routers polled successfully, slowest took {max([result.duration for result in results], default=0):.2f} s")
+
+
+def print_dashboard(client, show_wifi, show_ips, log_entries, exclude_string, include, store, dynamic_mode, refresh_time, writer=None):
+    """
+    Print several kinds of information at once, the parameters of all of them are requested together
+    :param client: SpeedportClient of the router to query
+    :param bool show_wifi: show wifi interface information
+    :param bool show_ips: show external ip addresses
+    :param int log_entries: number of log entries to show, 0 for none
+    :param str exclude_string: log message groups which should be excluded or -if include==True - should be included
+    :param bool include: determines whether to include or exclude the groups given in exclude_string
+    :param store: logstore.LogStore of the router, new log entries are added to it; None if no log entries are shown
+    :param bool dynamic_mode: refresh the information after refresh_time
+    :param float refresh_time: seconds to wait between two refreshes
+    :param writer: output.RecordWriter for structured output (one record per refresh), None for colored text
+    """
+    renderer = poller.ScreenRenderer()
+    excluded_groups = logparser.excluded_groups(exclude_string, include)
+    while True:
+        selected = {}
+        if show_wifi:
+            selected["wifi"] = commands.wifi_interfaces()
+        if show_ips:
+            selected["ips"] = commands.external_ips()
+        if log_entries != 0:
+            selected["log"] = commands.syslog()
+        try:
+            results = dict(zip(selected, client.run(list(selected.values()))))
+        except POLL_ERRORS as e:  # router not reachable, dynamic mode keeps polling
+            if not dynamic_mode:
+                raise
+            print_poll_error(e, renderer if writer is None else None)
+            time.sleep(refresh_time)
+            continue
+
+        entries = []
+        if log_entries != 0:
+            update_syslog_store(client, store, results["log"])
+            entries = logstore.select_entries(results["log"], log_entries, excluded_groups)
+
+        if writer is not None:
+            record = {"timestamp": time.time()}
+            if show_wifi:
+                record["wifi"] = [interface.to_dict() for interface in results["wifi"]]
+            if show_ips:
+                record["ips"] = results["ips"]
+            if log_entries != 0:
+                record["log"] = [entry.to_dict() for entry in entries]
+            writer.write([record])
+        else:
+            lines = []
+            if show_wifi:
+                lines += format_wifi_interfaces(results["wifi"]).split("\n")
+            if show_ips:
+                lines += format_external_ips(results["ips"]).split("\n")
+            lines += [format_syslog_entry(entry) for entry in entries]
+            if dynamic_mode:  # redraw only changed lines
+                with profiler.span("render"):
+                    renderer.render(lines)
+            else:
+                print("\n".join(lines))
+
+        if not dynamic_mode:
+            return
+        time.sleep(refresh_time)
+
+
+def collect_metrics(client):
+    """
+    Collect wifi and external ip information of a router for the exporter
+    :param client: SpeedportClient of the router to query
+    :return: list of exporter.Metric
+    """
+    interfaces, addresses = client.run([commands.wifi_interfaces(), commands.external_ips()])
+
+    # clients of all up interfaces, the host table is requested only once for all of them
+    client.all_wifi_clients(interfaces)
+    metrics = exporter.wifi_metrics(interfaces) + exporter.ip_metrics(addresses)
+    if profiler.enabled:
+        metrics += exporter.profile_metrics(profiler)
+    return metrics
 
 
 def main():
-    global password
+    global speedport_client, print_stats, profiler, profile_format, notice_stream, redraws_screen
 
     # argparser
     parser = argparse.ArgumentParser(description=f"Comman Line Interface for Speedport Pro - Tobias Bittner ({time.strftime('%Y', time.localtime(time.time()))})" + BashColors.reset,
                                      formatter_class=FormatterHelp)
     parser.add_argument("-v", "--version", action="version", version="0.2.0 beta")
+    parser.add_argument("-a", "--address", help="IP address of your Speedport", metavar="address", nargs=1, default=["192.168.2.1"])
+    parser.add_argument("--port", help="Port of the TR-064 (SOAP) interface of your Speedport", metavar="port", nargs=1, default=[49443])
     parser.add_argument("-p", "--password", default=argparse.SUPPRESS, help="Your Speedport Web-Ui password", metavar="password", nargs=1, required=False)
     parser.add_argument("-m", "--mode",
                         help="Set the mode (s -> static, print information once and exit / d -> dynamic, refresh information after given time (-t)", nargs=1, metavar="mode", default=["s"])
     parser.add_argument("-t", "--time", help="Time (seconds) to wait until data is refreshed. (dynamic mode only)", metavar="refreshTime", nargs=1, default=[2])
+    parser.add_argument("-mi", "--metadata-interval", help="Number of refreshes after which the wifi interface information (ssid, channel, ...) is requested again. (dynamic mode only)",
+                        metavar="refreshCount", nargs=1, default=[10])
     parser.add_argument("-w", "--wifi", help="Information about available wifi interfaces.", action="store_true", default=argparse.SUPPRESS)
-    parser.add_argument("-wi", "--wifi-interface", help="Information about the selected wifi interface, such as connected clients. (run -w before to get number)", metavar="interface_number",
+    parser.add_argument("-wi", "--wifi-interface", help="Information about the selected wifi interface, such as connected clients. (run -w before to get number, all for every interface which is up)", metavar="interface_number",
                         nargs=1, default=argparse.SUPPRESS)
     parser.add_argument("-ip", "--ipAddress", help="Print ip address information (e for external)", metavar="addressType", nargs=1, default=argparse.SUPPRESS)
     parser.add_argument("-l", "--log",
@@ -472,132 +536,344 @@ def main():
                                                     "\ndd -> Dynamic DNS\nl -> LTE, SIM Card\nd -> DSL, configurator service\ni -> IGMP\nw -> wifi\nvpn -> vpn\ndh -> DHCP\nu -> unclassified"
                                                     "\nYou can choose multiple options, they must be separated with a comma, e.g. -lf in w (show only entries related to wifi) or -lf ex "
                                                     "\"dh,wui\" to exclude entries related to DHCP and webui login attempts.", metavar="syslogFilter", nargs=2, default=argparse.SUPPRESS)
-    # parser.add_argument("-u", "--uptime", help="Print uptime", default=argparse.SUPPRESS, action="store_true")
+    parser.add_argument("--follow", help="Keep printing new log entries as they appear, refreshed after given time (-t). (-l only)", action="store_true")
+    parser.add_argument("--cached", help="Print log entries from the local cache, without requesting the log. (-l only)", action="store_true")
+    parser.add_argument("--cache-dir", help="Directory for the local log cache.", metavar="directory", nargs=1, default=[logstore.default_cache_directory()])
+    parser.add_argument("--no-cache", help="Request all parameters on every refresh, instead of caching static ones (ssid, bssid, ...).", action="store_true")
+    parser.add_argument("--cache-ttl", help="Time (seconds) values of a parameter path are cached, {i} matches any instance number, e.g. Device.WiFi.SSID.{i}.SSID=600. "
+                                            "Can be used multiple times, 0 disables caching for the path.", metavar="path=seconds", action="append", default=[])
+    parser.add_argument("--cache-stats", help="Print cache hit/miss counters before exiting.", action="store_true")
+    parser.add_argument("--max-parameters", help="Max. number of parameter names merged into one request, when several kinds of information are requested together.",
+                        metavar="count", nargs=1, default=[64])
+    parser.add_argument("--timeout", help="Time (seconds) to wait for the connection to the router and for each read, e.g. 5,30. A single value is used for both.",
+                        metavar="connect[,read]", nargs=1, default=["5,30"])
+    parser.add_argument("--retries", help="Number of repetitions of a request which timed out or was rejected by an overloaded router, with exponential backoff.",
+                        metavar="count", nargs=1, default=[2])
+    parser.add_argument("--rate-limit", help="Max. number of requests per second sent to the router, 0 for no limit.", metavar="requests", nargs=1, default=[10])
+    parser.add_argument("--profile", help="Print the time spent in each phase (connect, auth, send, receive, parse, merge, render) to stderr before exiting, "
+                                          "as table or json. In exporter mode the phases are exported as metrics.", choices=["table", "json"], nargs="?", const="table", default=None)
+    parser.add_argument("-o", "--format", help="Output format. json, ndjson and csv write structured records without colors, in dynamic mode ndjson writes one line per refresh.",
+                        choices=output.FORMATS, default="text")
+    parser.add_argument("-e", "--exporter", help="Run as Prometheus exporter, serving wifi and external ip metrics at http://<host>:<port>/metrics.",
+                        metavar="port", nargs=1, default=argparse.SUPPRESS)
+    parser.add_argument("-et", "--exporter-ttl", help="Time (seconds) a collected result is reused for further scrapes. (exporter only)", metavar="ttl", nargs=1, default=[10])
+    parser.add_argument("-f", "--fleet", help="Poll all routers of an inventory file (ini format, one section per router with address, password and optionally port, default --port) at the same time.\n"
+                                              "Collects wifi interfaces (-w), external ips (-ip) and log entries (-l), defaults to wifi interfaces and external ips.",
+                        metavar="inventoryFile", nargs=1, default=argparse.SUPPRESS)
+    parser.add_argument("-fw", "--fleet-workers", help="Max. number of routers polled in parallel. (fleet mode only)", metavar="workers", nargs=1, default=[8])
+    parser.add_argument("-ft", "--fleet-timeout", help="Time (seconds) to wait for a single router. (fleet mode only)", metavar="timeout", nargs=1, default=[10])
+    parser.add_argument("--log-stats", help="Print counts, events per hour and time between events for each message group and code of saved logs "
+                                              "(text, ndjson or the local log cache). Without files, the local log cache of the router (-a) is analyzed.",
+                        metavar="file", nargs="*", default=argparse.SUPPRESS)
+    parser.add_argument("--record", help="Store signal strength and rates of the clients of every refresh in the cache directory. (-wi only)", action="store_true")
+    parser.add_argument("-q", "--query", help="Print min/avg/percentiles of signal strength and rates per client, recorded with --record within the given time window, "
+                                              "e.g. 30m, 12h or 7d.", metavar="window", nargs=1, default=argparse.SUPPRESS)
+    parser.add_argument("--watch", help="Print events (client joined/left, interface up/down, new log entry flagged red) as they happen. Only the interface status and "
+                                         "number of clients are polled, clients are requested when they change.", action="store_true")
+    parser.add_argument("--watch-interval", help="Time (seconds) between two polls of the status and number of clients. (--watch only)", metavar="seconds", nargs=1, default=[0.5])
+    parser.add_argument("--watch-log", help="Time (seconds) between two requests of the log, 0 to not watch the log. (--watch only)", metavar="seconds", nargs=1, default=[10])
+    parser.add_argument("--hook", help="Shell command run for each event, the event is passed as json on stdin. Can be given multiple times. (--watch only)",
+                        metavar="command", action="append", default=[])
+    parser.add_argument("--webhook", help="URL each event is posted to as json, e.g. http://127.0.0.1:8080/speedport. Can be given multiple times. (--watch only)",
+                        metavar="url", action="append", default=[])
+    parser.add_argument("-u", "--device-info", help="Print model, firmware, uptime and dsl sync rates.", default=argparse.SUPPRESS, action="store_true")
 
     args = parser.parse_args()
+    print_stats = args.cache_stats
+    profile_format = args.profile
+    if args.format != "text":  # records are written to stdout
+        notice_stream = sys.stderr
+    profiler = profiling.Profiler(enabled=profile_format is not None)
 
     dynamic_mode = args.mode[0] == "d"
 
-    if hasattr(args, "password"):
-        password = args.password[0]
-
-    # limit refresh interval in dynamic mode to min. 2 seconds
-    if float(args.time[0]) < 2:
-        args.time[0] = 2
-
-    if hasattr(args, "wifi"):  # wifi interface info
+    address = args.address[0]
+    password = args.password[0] if hasattr(args, "password") else None
+
+    # one client for all requests of this run, keeps the connection alive and caches the auth nonce
+    response_cache = None
+    if not args.no_cache:
+        ttls = dict(cache.DEFAULT_TTLS)
+        try:
+            ttls.update(cache.parse_ttl(option) for option in args.cache_ttl)
+        except ValueError:
+            exit_with_error_message(1, "Invalid cache ttl, use path=seconds")
+        response_cache = cache.ResponseCache(ttls)
+    # timeouts, retries and rate limit protect the router (and dynamic mode) from hanging or being flooded with requests
+    try:
+        timeout = tuple(float(value) for value in args.timeout[0].split(","))
+        rate_limit = float(args.rate_limit[0])
+    except ValueError:
+        exit_with_error_message(1, "Invalid timeout or rate limit, use seconds (connect,read) and requests per second")
+    request_scheduler = scheduler.RequestScheduler(int(args.retries[0]), rate_limit=scheduler.TokenBucket(rate_limit, burst=4) if rate_limit > 0 else None,
+                                                   breaker=scheduler.CircuitBreaker(), is_transient=soap.is_transient)
+    speedport_client = SpeedportClient(address, password, port=int(args.port[0]), max_parameters=int(args.max_parameters[0]), timeout=timeout if len(timeout) > 1 else timeout[0],
+                                       cache=response_cache, profiler=profiler, scheduler=request_scheduler)
+
+    # several kinds of information, requested together (dashboard)
+    combined = [hasattr(args, "wifi"), hasattr(args, "ipAddress") and args.ipAddress[0] == "e", hasattr(args, "log") and not args.follow and not args.cached].count(True) > 1
+
+    # writer for structured output, None for colored text
+    writer = output.RecordWriter(args.format) if args.format != "text" else None
+    if writer is not None and args.format == "json" and ((dynamic_mode and (combined or hasattr(args, "wifi_interface"))) or (hasattr(args, "log") and args.follow)):
+        writer.format = "ndjson"  # a json document can't be streamed, use one line per refresh or entry (other operations fall back to static mode)
+
+    # limit refresh interval in dynamic mode to min. 0.5 seconds
+    if float(args.time[0]) < 0.5:
+        args.time[0] = 0.5
+
+    if hasattr(args, "exporter"):  # metrics server, runs until interrupted
+        print_notice(f"[i] Serving metrics at http://0.0.0.0:{args.exporter[0]}/metrics")
+        exporter.serve(exporter.ScrapeCache(functools.partial(collect_metrics, speedport_client), float(args.exporter_ttl[0])), int(args.exporter[0]))
+    elif hasattr(args, "fleet"):  # all routers of the inventory
         if dynamic_mode:
-            print("[i] Dynamic mode not supported by this operation, static will be used.")
-        interfaces = get_all_wifi_interfaces()
-        print(f"= = = = = WiFi interface Information = = = = = ({BashColors.light_green}UP{BashColors.reset}) ({BashColors.light_red}DOWN{BashColors.reset})")
-
-        data = []
-        for interface in interfaces:
-            if interface.up:
-                data.append([f"{BashColors.light_green}{interface.id}", interface.frequency, interface.mac_address, interface.ssid, interface.channel, interface.encryption, interface.power,
-                             f"{interface.data_rate_max}{BashColors.reset}"])
-
+            print_notice("[i] Dynamic mode not supported by this operation, static will be used.")
+        collect_wifi = hasattr(args, "wifi")
+        collect_ips = hasattr(args, "ipAddress")
+        log_entries = int(args.log[0]) if hasattr(args, "log") else 0
+        if not collect_wifi and not collect_ips and log_entries == 0:
+            collect_wifi = collect_ips = True
+        if args.format == "csv":
+            exit_with_error_message(1, "csv output is not supported in fleet mode, use json or ndjson")
+        print_fleet(args.fleet[0], collect_wifi, collect_ips, log_entries, int(args.fleet_workers[0]), float(args.fleet_timeout[0]), writer,
+                    {"port": int(args.port[0]), "timeout": timeout if len(timeout) > 1 else timeout[0], "retries": int(args.retries[0]), "rate_limit": rate_limit})
+    elif hasattr(args, "log_stats"):  # saved logs, without requesting the router
+        if dynamic_mode:
+            print_notice("[i] Dynamic mode not supported by this operation, static will be used.")
+        paths = args.log_stats if len(args.log_stats) > 0 else [logstore.LogStore(args.cache_dir[0], address).entries_path]
+        try:
+            analyzer = loganalytics.analyze_files(paths, os.cpu_count() or 1)
+        except OSError as e:
+            exit_with_error_message(1, f"Can't read log: {e}")
+        if writer is not None:
+            if args.format == "csv":  # one row per message code
+                writer.write([dict({"code": code}, **{key: value for key, value in entry.items() if key != "hours"}) for code, entry in analyzer.to_dict()["codes"].items()])
             else:
-                data.append([f"{BashColors.light_red}{interface.id}", interface.frequency, interface.mac_address, f"{interface.ssid}{BashColors.reset}"])
-
-        print(tabulate(data, headers=["No.", "Frequency", "MAC", "SSID", "Channel", "Encryption", "Power (%)", "MaxDataRate (mbit/s)"]))
+                writer.write([analyzer.to_dict()])
+        else:
+            print(format_log_statistics(analyzer))
+    elif hasattr(args, "query"):  # recorded client history, without requesting the router
+        if dynamic_mode:
+            print_notice("[i] Dynamic mode not supported by this operation, static will be used.")
+        try:
+            window = recorder.parse_window(args.query[0])
+        except ValueError:
+            exit_with_error_message(1, "Invalid time window, use seconds or a number with unit s, m, h or d")
+        end = time.time()
+        statistics = recorder.ClientRecorder(args.cache_dir[0], address).query(end - window, end)
+        if writer is not None:
+            if args.format == "csv":  # nested statistics as flat columns, e.g. signal_strength_p50
+                for entry in statistics:
+                    for column in ("signal_strength", "downstream_speed", "upstream_speed"):
+                        entry.update((f"{column}_{name}", value) for name, value in entry.pop(column).items())
+            writer.write(statistics)
+        else:
+            print(format_client_history(statistics))
+    elif args.watch:  # events, runs until interrupted
+        if args.format == "csv":
+            exit_with_error_message(1, "csv output is not supported for events, use json or ndjson")
+        if writer is not None:
+            writer.format = "ndjson"  # one line per event
+        hooks = [watcher.command_hook(command) for command in args.hook] + [watcher.webhook(url) for url in args.webhook]
+        log_interval = float(args.watch_log[0])
+        event_watcher = watcher.Watcher(speedport_client, hooks, interval=max(0.1, float(args.watch_interval[0])), log_interval=log_interval,
+                                        store=logstore.LogStore(args.cache_dir[0], address) if log_interval > 0 else None)
+        print_notice(f"[i] Watching {address}, press Ctrl+C to stop")
+        try:
+            while True:
+                start = time.monotonic()
+                try:
+                    events = event_watcher.poll()
+                except POLL_ERRORS as e:  # router not reachable, keep watching
+                    print_poll_error(e)
+                    events = []
+                if writer is not None:
+                    writer.write(events)
+                else:
+                    for event in events:
+                        print(format_event(event))
+                time.sleep(max(0.0, event_watcher.interval - (time.monotonic() - start)))
+        finally:  # Ctrl+C or error, deliver the events which are still queued
+            event_watcher.hooks.wait()
+    elif combined:  # several kinds of information, requested together
+        redraws_screen = dynamic_mode and writer is None
+        show_ips = hasattr(args, "ipAddress") and args.ipAddress[0] == "e"
+        include = False
+        exclude_string = ""
+        if hasattr(args, "log_filter"):
+            include = args.log_filter[0] == "in"
+            exclude_string = args.log_filter[1]
+        if args.format == "csv":
+            exit_with_error_message(1, "csv output is not supported for combined information, use json or ndjson")
+        print_dashboard(speedport_client, hasattr(args, "wifi"), show_ips, int(args.log[0]) if hasattr(args, "log") else 0, exclude_string, include,
+                        logstore.LogStore(args.cache_dir[0], address) if hasattr(args, "log") else None, dynamic_mode, float(args.time[0]), writer)
+    elif hasattr(args, "wifi"):  # wifi interface info
+        if dynamic_mode:
+            print_notice("[i] Dynamic mode not supported by this operation, static will be used.")
+        if writer is not None:
+            writer.write([interface.to_dict() for interface in speedport_client.wifi_interfaces()])
+        else:
+            print(format_wifi_interfaces(speedport_client.wifi_interfaces()))
     elif hasattr(args, "wifi_interface"):
-        interfaces = get_all_wifi_interfaces()
+        all_interfaces = args.wifi_interface[0] == "all"
+        if all_interfaces:  # clients of all up interfaces, the host table is requested once per refresh
+            interfaces = speedport_client.wifi_interfaces()
+            if not any(interface.up for interface in interfaces):
+                exit_with_error_message(1, "No interface is up!")
+
+            client_poller = poller.ClientPoller(speedport_client.wifi_interfaces, speedport_client.all_wifi_clients,
+                                                metadata_interval=int(args.metadata_interval[0]), interface=interfaces)
+        else:
+            if not args.wifi_interface[0].isdigit():
+                exit_with_error_message(1, "Interface number must be a number or all")
+            interface = speedport_client.wifi_interface(int(args.wifi_interface[0]))
 
-        # try to get index
-        index = -1
-        for x in range(0, len(interfaces)):
-            if interfaces[x].id == int(args.wifi_interface[0]):
-                index = x
-                break
+            if interface is None:
+                exit_with_error_message(1, "Interface with specified number not found")
 
-        if index == -1:
-            exit_with_error_message(1, "Interface with specified number not found")
+            if not interface.up:
+                exit_with_error_message(1, "Specified interface is not up!")
 
-        if not interfaces[index].up:
-            exit_with_error_message(1, "Specified interface is not up!")
+            # the poller keeps the last client snapshot, interface information is only refreshed every few polls
+            client_poller = poller.ClientPoller(functools.partial(speedport_client.wifi_interface, interface.id), speedport_client.wifi_clients,
+                                                metadata_interval=int(args.metadata_interval[0]), interface=interface)
+        renderer = poller.ScreenRenderer()
+        redraws_screen = dynamic_mode and writer is None
+        client_recorder = recorder.ClientRecorder(args.cache_dir[0], address) if args.record else None
 
         once = True
         while dynamic_mode or once:
             if once:
                 once = False
 
-            interface: wifi.WifiInterface = get_clients_for_wifi_interface(interfaces[index])
-
-            if dynamic_mode:
-                os.system('cls' if os.name == 'nt' else 'clear')
-
-            print(f"= = = = = Information for interface {interface.id} = = = = =")
-            print(f"{BashColors.light_green if interface.up else BashColors.light_red}Frequency: {interface.frequency}, SSID: {interface.ssid}, MAC: {interface.mac_address}\n"
-                  f"Channel: {interface.channel}, Power: {interface.power}%, Encryption: {interface.encryption}")
-
-            print(f"{BashColors.cyan}Clients {str(len(interface.clients))}{BashColors.reset}")
-            if len(interface.clients) > 0:
-                data = []
-                for client in interface.clients:
-                    if client.active:
-                        data.append([client.mac_address, client.ip_address,
-                                     f"{(BashColors.light_red if client.signal_strength < -70 else BashColors.light_green)}{str(client.signal_strength)}{BashColors.reset}", client.host_name,
-                                     client.downstream_speed, client.upstream_speed])
-
-                print(tabulate(data, headers=["MAC", "IP", "Signal strength", "Host-Name", "Downlink", "Uplink"]))
+            try:
+                result, changes = client_poller.poll()
+            except POLL_ERRORS as e:  # router not reachable, dynamic mode keeps polling
+                if not dynamic_mode:
+                    raise
+                print_poll_error(e, renderer if writer is None else None)
+                time.sleep(float(args.time[0]))
+                continue
+            interfaces = [interface for interface in result if interface.up] if all_interfaces else [result]
+            if client_recorder is not None:
+                table = wifi.ClientTable()
+                for interface in interfaces:
+                    table.extend(interface)
+                client_recorder.append(table, time.time())
+
+            if writer is not None:
+                if args.format == "csv":  # one row per client
+                    writer.write([dict(client.to_dict(), interface=interface.id, timestamp=time.time()) for interface in interfaces for client in interface.clients])
+                else:  # one record per refresh
+                    record = {"timestamp": time.time()}
+                    if all_interfaces:
+                        record["interfaces"] = [interface.to_dict(with_clients=True) for interface in interfaces]
+                    else:
+                        record["interface"] = result.to_dict(with_clients=True)
+                    record.update(joined=[client.mac_address for client in changes.joined], left=[client.mac_address for client in changes.left])
+                    writer.write([record])
+            elif dynamic_mode:  # redraw only changed lines
+                lines = "\n".join(format_wifi_interface(interface) for interface in interfaces).split("\n") + \
+                        [f"Changes: {len(changes.joined)} joined, {len(changes.left)} left, {len(changes.changed)} changed"]
+                with profiler.span("render"):
+                    renderer.render(lines)
+            else:
+                print("\n".join(format_wifi_interface(interface) for interface in interfaces))
 
             if dynamic_mode:
-                if not interface.up:
+                if len(interfaces) == 0 or not all(interface.up for interface in interfaces):
                     dynamic_mode = False
 
             if dynamic_mode:
                 time.sleep(float(args.time[0]))
-                interfaces = get_all_wifi_interfaces()
 
     elif hasattr(args, "ipAddress"):
         if dynamic_mode:
-            print("[i] Dynamic mode not supported by this operation, static will be used.")
+            print_notice("[i] Dynamic mode not supported by this operation, static will be used.")
         if args.ipAddress[0] == "e":
-            print(get_external_ips())
+            if writer is not None:
+                writer.write(speedport_client.external_ips())
+            else:
+                print(format_external_ips(speedport_client.external_ips()))
     elif hasattr(args, "log"):
-        if dynamic_mode:
-            print("[i] Dynamic mode not supported by this operation, static will be used.")
+        if dynamic_mode and not args.follow:
+            print_notice("[i] Dynamic mode not supported by this operation, static will be used.")
         include = False
+        exclude_string = ""
         if hasattr(args, "log_filter"):
-            if args.syslog_filter[0] == "in":
-                include = True
-            print_syslog(int(args.syslog[0]), args.syslog_filter[1], include)
+            include = args.log_filter[0] == "in"
+            exclude_string = args.log_filter[1]
+
+        store = logstore.LogStore(args.cache_dir[0], address)
+        if args.follow:
+            follow_syslog(speedport_client, store, int(args.log[0]), logparser.excluded_groups(exclude_string, include), float(args.time[0]), writer)
+        elif args.cached:  # serve from local store, without requesting the log
+            excluded_groups = logparser.excluded_groups(exclude_string, include)
+            print_syslog_entries([entry for entry in store.read(int(args.log[0])) if entry.group not in excluded_groups], writer)
         else:
-            print_syslog(int(args.syslog[0]), "", False)
-    elif hasattr(args, "uptime"):
+            lines = update_syslog_store(speedport_client, store)[0]
+            print_syslog_entries(logstore.select_entries(lines, int(args.log[0]), logparser.excluded_groups(exclude_string, include)), writer)
+    elif hasattr(args, "device_info"):
         if dynamic_mode:
-            print("[i] Dynamic mode not supported by this operation, static will be used.")
-        print(get_uptime())
+            print_notice("[i] Dynamic mode not supported by this operation, static will be used.")
+        if writer is not None:
+            writer.write([speedport_client.device_info()])
+        else:
+            print(format_device_info(speedport_client.device_info()))
+    print_cache_stats()
+    print_profile()
     exit(0)
 
 
+def print_profile():
+    """
+    Print the time spent in each phase to stderr, if requested with --profile
+    """
+    if profile_format is not None and profiler is not None:
+        print(profiler.format_report(profile_format), file=sys.stderr)
+
+
+def print_cache_stats():
+    """
+    Print the hit/miss counters of the response cache, if requested with --cache-stats
+    """
+    if print_stats and speedport_client is not None and speedport_client.cache is not None:
+        print_notice(f"[i] Cache: {speedport_client.cache.stats()}")
+
+
 def exit_with_error_message(exit_code, error_message):
     """
     Helper method zo exit with a message and a exit code, in case of an error
     :param exit_code: process return code as use in exit()
     :param error_message: exit message to print
     """
-    print(f"{BashColors.light_red}[-] {error_message}{BashColors.reset}")
+    print_notice(f"{BashColors.light_red}[-] {error_message}{BashColors.reset}")
     exit(exit_code)
 
 
-if __name__ == '__main__':
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+def print_notice(message):
+    """
+    Print a notice, to stderr if structured output is written, so it doesn't corrupt the records
+    :param message: message to print
+    """
+    print(message, file=notice_stream)
 
-    ipAddress = "192.168.2.1"  # todo argument for ip address
-    password = None
-    headers = {
-        "User-Agent": "Speedport-Pro-CLI/0.2.0 (Python)",
-        "Accept": "*/*",
-        "SOAPAction": "urn:telekom-de:device:TO_InternetGatewayDevice:2#GetParameterValues",
-        "Content-Type": "text/xml; charset=utf-8"
-    }
+
+if __name__ == '__main__':
 
     try:
         main()
+    except (soap.AuthenticationError, soap.SoapFault, scheduler.CircuitOpenError) as e:
+        exit_with_error_message(1, str(e))
+    except OSError as e:
+        if not soap.is_transient(e):  # e.g. broken pipe of the output
+            raise
+        exit_with_error_message(1, f"Router not reachable: {e}")
     except KeyboardInterrupt:
-        os.system('cls' if os.name == 'nt' else 'clear')
-        time.sleep(1)
-        print(BashColors.blue + "[~] Aborted by user..." + BashColors.reset)
+        if redraws_screen:  # scrolling output (events, log, structured records) is kept
+            os.system('cls' if os.name == 'nt' else 'clear')
+            time.sleep(1)
+        print_notice(BashColors.blue + "[~] Aborted by user..." + BashColors.reset)
+        print_cache_stats()
+        print_profile()
         exit(0)